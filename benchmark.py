@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bus import Bus
+from coherence import run
+from core import Core
+from profiler import timed
+from traces import discover_traces, load_trace
+
+PROTOCOLS = ["MESI", "Dragon"]
+# (cache_size, associativity, block_size)
+CONFIGS = [(4096, 2, 32), (1024, 1, 16), (32768, 8, 64)]
+LINE = 64  # generators lay data out in 64-byte lines
+
+
+def _emit(rng, label, address, compute_ratio, out):
+    if rng.random() < compute_ratio:
+        out.append(f"2 {hex(rng.randint(1, 32))}\n")
+    out.append(f"{label} {hex(address)}\n")
+
+
+def private_streaming(rng, core_id, num_cores, refs, out):
+    # each core walks sequentially through its own region
+    base = 0x10000000 + core_id * 0x01000000
+    for i in range(refs):
+        label = 1 if i % 4 == 3 else 0
+        _emit(rng, label, base + (i * 4) % 0x00400000, 0.3, out)
+
+
+def false_sharing(rng, core_id, num_cores, refs, out):
+    # cores write distinct words that share a handful of lines
+    base = 0x20000000
+    for _ in range(refs):
+        line = rng.randrange(16)
+        label = 1 if rng.random() < 0.5 else 0
+        _emit(rng, label, base + line * LINE + (core_id % (LINE // 4)) * 4, 0.2, out)
+
+
+def producer_consumer(rng, core_id, num_cores, refs, out):
+    # core 0 fills a ring buffer that every other core reads
+    base = 0x30000000
+    for i in range(refs):
+        offset = (i * 4) % (256 * LINE)
+        label = 1 if core_id == 0 else 0
+        _emit(rng, label, base + offset, 0.3, out)
+
+
+def migratory(rng, core_id, num_cores, refs, out):
+    # read-modify-write on shared objects, so ownership migrates between cores
+    base = 0x40000000
+    for i in range(0, refs, 2):
+        address = base + rng.randrange(64) * LINE
+        _emit(rng, 0, address, 0.3, out)
+        _emit(rng, 1, address, 0.0, out)
+
+
+def read_mostly(rng, core_id, num_cores, refs, out):
+    # a shared table read by all cores with rare updates
+    base = 0x50000000
+    for _ in range(refs):
+        label = 1 if rng.random() < 0.01 else 0
+        _emit(rng, label, base + rng.randrange(1024) * 4, 0.3, out)
+
+
+PATTERNS = {
+    'private_streaming': private_streaming,
+    'false_sharing': false_sharing,
+    'producer_consumer': producer_consumer,
+    'migratory': migratory,
+    'read_mostly': read_mostly,
+}
+
+
+def generate(pattern, directory, num_cores=4, refs=20000, seed=0):
+    # writes <directory>/<pattern>_<core>.data in the usual "label hex" format
+    os.makedirs(directory, exist_ok=True)
+    for core_id in range(num_cores):
+        rng = random.Random(f"{seed}-{pattern}-{core_id}")
+        out = []
+        PATTERNS[pattern](rng, core_id, num_cores, refs, out)
+        with open(os.path.join(directory, f"{pattern}_{core_id}.data"), 'w') as file:
+            file.writelines(out)
+    return directory
+
+
+def run_case(case):
+    # Runs in a fresh worker process so peak RSS belongs to this case alone
+    traces = [load_trace(path) for path in case['paths']]
+    shared_bus = Bus()
+    cores = [
+        Core(i, case['cache_size'], case['associativity'], case['block_size'], case['protocol'], trace, shared_bus)
+        for i, trace in enumerate(traces)
+    ]
+    timers = {'execute': 0.0, 'snoop': 0.0}
+    calls = {'execute': 0, 'snoop': 0}
+    for core in cores:
+        core.execute = timed(core.execute, timers, calls, 'execute')
+        core.protocol.snoop = timed(core.protocol.snoop, timers, calls, 'snoop')
+
+    start = time.perf_counter()
+    run(cores, shared_bus)
+    elapsed = time.perf_counter() - start
+
+    references = sum(core.loads + core.stores for core in cores)
+    return {
+        'pattern': case['pattern'],
+        'protocol': case['protocol'],
+        'cache_size': case['cache_size'],
+        'associativity': case['associativity'],
+        'block_size': case['block_size'],
+        'references': references,
+        'overall_cycles': max(core.cycles for core in cores),
+        'seconds': elapsed,
+        'references_per_second': references / elapsed if elapsed else 0.0,
+        'execute_seconds': timers['execute'],
+        'snoop_seconds': timers['snoop'],
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def case_key(result):
+    return (f"{result['pattern']}/{result['protocol']}/"
+            f"{result['cache_size']}-{result['associativity']}-{result['block_size']}")
+
+
+def compare(results, baseline, tolerance):
+    # A case fails when it got slower than the tolerance allows or simulated differently
+    failures = []
+    previous = {case_key(result): result for result in baseline['results']}
+    for result in results:
+        key = case_key(result)
+        if key not in previous:
+            continue
+        old = previous[key]
+        if result['overall_cycles'] != old['overall_cycles']:
+            failures.append(f"{key}: overall cycles {old['overall_cycles']} -> {result['overall_cycles']}")
+        floor = old['references_per_second'] * (1 - tolerance)
+        if result['references_per_second'] < floor:
+            failures.append(f"{key}: {result['references_per_second']:.0f} refs/s "
+                            f"below baseline {old['references_per_second']:.0f} refs/s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simulator throughput on synthetic traces")
+    parser.add_argument("--pattern", nargs='+', choices=sorted(PATTERNS), default=sorted(PATTERNS),
+                        help="Synthetic trace patterns")
+    parser.add_argument("--protocol", nargs='+', choices=PROTOCOLS, default=PROTOCOLS, help="Coherence protocols")
+    parser.add_argument("--cores", type=int, default=4, help="Cores per synthetic trace")
+    parser.add_argument("--refs", type=int, default=20000, help="Memory references per core")
+    parser.add_argument("--seed", type=int, default=0, help="Trace generator seed")
+    parser.add_argument("--save", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", help="Fail if slower than this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed throughput drop relative to the baseline (default: 0.2)")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = []
+        for pattern in args.pattern:
+            directory = generate(pattern, os.path.join(workdir, pattern), args.cores, args.refs, args.seed)
+            paths = discover_traces(directory)
+            for protocol in args.protocol:
+                for cache_size, associativity, block_size in CONFIGS:
+                    cases.append({
+                        'pattern': pattern,
+                        'protocol': protocol,
+                        'cache_size': cache_size,
+                        'associativity': associativity,
+                        'block_size': block_size,
+                        'paths': paths,
+                    })
+
+        print(f"{'case':<44} {'refs/s':>10} {'execute':>8} {'snoop':>8} {'rss MB':>7}")
+        # one worker per case, run one at a time so timings don't contend
+        for case in cases:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(run_case, case).result()
+            results.append(result)
+            print(f"{case_key(result):<44} {result['references_per_second']:>10.0f} "
+                  f"{result['execute_seconds']:>7.2f}s {result['snoop_seconds']:>7.2f}s "
+                  f"{result['peak_rss_kb'] / 1024:>7.1f}")
+
+    report = {
+        'python': sys.version.split()[0],
+        'cores': args.cores,
+        'refs': args.refs,
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        failures = compare(results, baseline, args.tolerance)
+        for failure in failures:
+            print('REGRESSION', failure)
+        if failures:
+            sys.exit(1)
+        print('No regressions against', args.compare)
+
+
+if __name__ == "__main__":
+    main()
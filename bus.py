@@ -3,6 +3,8 @@ from enum import Enum
 
 
 class Transaction:
+    __slots__ = ('core_id', 'trans_type', 'address')
+
     class Type(Enum):
         BusRd = 0
         BusRdX = 1
@@ -18,6 +20,9 @@ class Transaction:
 class Bus:
     def __init__(self):
         self.S = {}
+        self.sharers = {}  # block address -> bitmap of cores whose cache holds the block
+        self.num_cores = 0
+        self.offset_bits = 0
         self.queue = deque()
         self.traffic_bytes = 0
         self.invalidations = 0
@@ -38,6 +43,44 @@ class Bus:
                 if self.S[address] == 0:
                     del self.S[address]
 
+    def attach(self, core_id, cache):
+        cache.directory = self
+        cache.core_id = core_id
+        self.num_cores = max(self.num_cores, core_id + 1)
+        self.offset_bits = cache.offset_bits
+
+    def add_sharer(self, block, core_id):
+        self.sharers[block] = self.sharers.get(block, 0) | (1 << core_id)
+
+    def remove_sharer(self, block, core_id):
+        bits = self.sharers.get(block, 0) & ~(1 << core_id)
+        if bits:
+            self.sharers[block] = bits
+        else:
+            self.sharers.pop(block, None)
+
+    def snoop_targets(self, transaction):
+        if transaction.address is None:
+            # every cache accounts for data flushed on the bus
+            return range(self.num_cores)
+
+        # only caches that hold the block can react to it, the issuer ignores its own requests
+        bits = self.sharers.get(transaction.address >> self.offset_bits, 0) & ~(1 << transaction.core_id)
+        targets = []
+        while bits:
+            low = bits & -bits
+            targets.append(low.bit_length() - 1)
+            bits ^= low
+        return targets
+
+    def drain(self, cores):
+        # deliver every queued transaction, including flushes raised by the snoops themselves
+        while self.queue:
+            transaction = self.get_next_transaction()
+            for core_id in self.snoop_targets(transaction):
+                core = cores[core_id]
+                core.cycles += core.protocol.snoop(transaction)
+
     def add_transaction(self, transaction):
         self.queue.appendleft(transaction)
 
@@ -46,11 +89,27 @@ class Bus:
             return self.queue.pop()
         return None
 
+    def stats(self):
+        accesses = self.private_access + self.public_access
+        return {
+            'traffic_bytes': self.traffic_bytes,
+            'invalidations': self.invalidations,
+            'updates': self.updates,
+            'private_access': self.private_access,
+            'public_access': self.public_access,
+            'private_access_rate': (self.private_access / accesses) * 100 if accesses else 0.0,
+            'public_access_rate': (self.public_access / accesses) * 100 if accesses else 0.0,
+        }
+
     def output(self):
-        print('===== REPORT FOR BUS =====')
-        print('Data Traffic (Bytes):', self.traffic_bytes)
-        print('Invalidations:', self.invalidations)
-        print('Updates:', self.updates)
-        print('Access to Private Data:', (self.private_access / (self.private_access + self.public_access)) * 100, "%")
-        print('Access to Public Data:', (self.public_access / (self.private_access + self.public_access)) * 100, "%")
-        print('\n')
+        print_report(self.stats())
+
+
+def print_report(stats):
+    print('===== REPORT FOR BUS =====')
+    print('Data Traffic (Bytes):', stats['traffic_bytes'])
+    print('Invalidations:', stats['invalidations'])
+    print('Updates:', stats['updates'])
+    print('Access to Private Data:', stats['private_access_rate'], "%")
+    print('Access to Public Data:', stats['public_access_rate'], "%")
+    print('\n')
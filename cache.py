@@ -1,11 +1,14 @@
 import math
+from array import array
+from collections import OrderedDict
 
+EMPTY = -1  # state of a line that has never been filled
 
-class CacheBlock:
-    def __init__(self, tag=None, state='I', cycle=0):
-        self.tag = tag
-        self.state = state
-        self.last_used_cycle = cycle
+
+def address_bits(size, associativity, block_size):
+    # (offset bits, index bits) of the address split for this geometry
+    num_sets = size // block_size // associativity
+    return int(math.log2(block_size)), int(math.log2(num_sets))
 
 
 class Cache:
@@ -15,8 +18,65 @@ class Cache:
         self.block_size = block_size
         self.num_blocks = self.size // block_size
         self.num_sets = self.num_blocks // self.associativity
-        self.offset_bits = int(math.log2(block_size))
-        self.index_bits = int(math.log2(self.num_sets))
-        self.blocks = [[CacheBlock() for _ in range(associativity)] for _ in range(self.num_sets)]
+        self.offset_bits, self.index_bits = address_bits(size, associativity, block_size)
+        # shift/mask used to split an integer address into set index and tag
+        self.index_mask = self.num_sets - 1
+        self.tag_shift = self.offset_bits + self.index_bits
+        # flat per-line storage, line (index, way) lives at index * associativity + way
+        num_lines = self.num_sets * associativity
+        self.tags = array('q', [-1]) * num_lines
+        self.states = array('b', [EMPTY]) * num_lines
+        self.last_used = array('q', [0]) * num_lines
+        # per set: tag -> way of every filled line, ordered least to most recently used
+        self.ways = [OrderedDict() for _ in range(self.num_sets)]
+        # set by Bus.attach so fills and evictions keep the sharer directory current
+        self.directory = None
+        self.core_id = None
         self.hit = 0
         self.miss = 0
+
+    def lookup(self, index, tag):
+        return self.ways[index].get(tag, -1)
+
+    def get_state(self, index, way):
+        return self.states[index * self.associativity + way]
+
+    def set_state(self, index, way, state):
+        self.states[index * self.associativity + way] = state
+
+    def touch(self, index, way, cycle):
+        line = index * self.associativity + way
+        self.last_used[line] = cycle
+        self.ways[index].move_to_end(self.tags[line])
+
+    def fill(self, index, way, tag, state, cycle):
+        line = index * self.associativity + way
+        ways = self.ways[index]
+        old_tag = None
+        if self.states[line] != EMPTY:
+            old_tag = self.tags[line]
+            del ways[old_tag]
+        self.tags[line] = tag
+        self.states[line] = state
+        self.last_used[line] = cycle
+        ways[tag] = way
+        if old_tag != tag and self.directory is not None:
+            if old_tag is not None:
+                self.directory.remove_sharer((old_tag << self.index_bits) | index, self.core_id)
+            self.directory.add_sharer((tag << self.index_bits) | index, self.core_id)
+
+    def empty_way(self, index):
+        # lines are never unfilled, so ways fill up in order
+        filled = len(self.ways[index])
+        return filled if filled < self.associativity else -1
+
+    def lru_way(self, index):
+        return next(iter(self.ways[index].values()))
+
+    def stats(self):
+        accesses = self.hit + self.miss
+        return {
+            'hits': self.hit,
+            'misses': self.miss,
+            'miss_rate': self.miss / accesses * 100 if accesses else 0.0,
+        }
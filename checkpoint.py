@@ -0,0 +1,155 @@
+import itertools
+import os
+import pickle
+import zlib
+from array import array
+from collections import OrderedDict
+
+from bus import Transaction
+from cache import EMPTY
+
+MAGIC = b'CCCK'
+VERSION = 2
+
+CORE_FIELDS = ('position', 'cycles', 'compute_cycles', 'loads', 'stores', 'next_issue')
+BUS_FIELDS = ('traffic_bytes', 'invalidations', 'updates', 'public_access', 'private_access')
+
+
+def cache_state(cache):
+    # recency order per set, least recently used first, padded with -1
+    order = array('i', [-1]) * len(cache.tags)
+    for index, ways in enumerate(cache.ways):
+        base = index * cache.associativity
+        for rank, way in enumerate(ways.values()):
+            order[base + rank] = way
+    return {
+        'tags': cache.tags,
+        'states': cache.states,
+        'last_used': cache.last_used,
+        'order': order,
+        'hit': cache.hit,
+        'miss': cache.miss,
+    }
+
+
+def restore_cache(cache, state):
+    cache.tags = array('q', state['tags'])
+    cache.states = array('b', state['states'])
+    cache.last_used = array('q', state['last_used'])
+    cache.hit = state['hit']
+    cache.miss = state['miss']
+    order = state['order']
+    cache.ways = []
+    for index in range(cache.num_sets):
+        base = index * cache.associativity
+        ways = OrderedDict()
+        for rank in range(cache.associativity):
+            way = order[base + rank]
+            if way == -1:
+                break
+            ways[cache.tags[base + way]] = way
+        cache.ways.append(ways)
+
+
+def snapshot(cores, shared_bus, global_cycle, config):
+    return {
+        'config': config,
+        'global_cycle': global_cycle,
+        'cores': [
+            dict({field: getattr(core, field) for field in CORE_FIELDS}, cache=cache_state(core.cache))
+            for core in cores
+        ],
+        'bus': dict(
+            {field: getattr(shared_bus, field) for field in BUS_FIELDS},
+            S=shared_bus.S,
+            queue=[(t.core_id, t.trans_type.value, t.address) for t in shared_bus.queue],
+        ),
+    }
+
+
+def restore(state, cores, shared_bus):
+    # cores must already be reading their traces from the saved positions, see seek()
+    for core, core_state in zip(cores, state['cores']):
+        for field in CORE_FIELDS:
+            setattr(core, field, core_state[field])
+        restore_cache(core.cache, core_state['cache'])
+
+    bus_state = state['bus']
+    for field in BUS_FIELDS:
+        setattr(shared_bus, field, bus_state[field])
+    shared_bus.S = dict(bus_state['S'])
+    shared_bus.queue.clear()
+    for core_id, trans_type, address in bus_state['queue']:
+        shared_bus.queue.append(Transaction(core_id, Transaction.Type(trans_type), address))
+
+    # the sharer directory is fully determined by the cache contents
+    shared_bus.sharers.clear()
+    for core in cores:
+        cache = core.cache
+        for line, tag in enumerate(cache.tags):
+            if cache.states[line] != EMPTY:
+                index = line // cache.associativity
+                shared_bus.add_sharer((tag << cache.index_bits) | index, core.core_id)
+
+
+def seek(trace, position):
+    # binary and preloaded traces jump straight to the record, streams skip ahead
+    if hasattr(trace, 'records'):
+        return trace.records(position)
+    return itertools.islice(trace, position, None)
+
+
+def save(path, state):
+    data = MAGIC + VERSION.to_bytes(4, 'little') + zlib.compress(pickle.dumps(state, protocol=5))
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as file:
+        file.write(data)
+    os.replace(tmp, path)  # never leave a half-written checkpoint behind
+
+
+def load(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:4] != MAGIC or int.from_bytes(data[4:8], 'little') != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} checkpoint")
+    return pickle.loads(zlib.decompress(data[8:]))
+
+
+class Checkpointer:
+    def __init__(self, path, config, every_cycles=None, every_refs=None, intervals=None):
+        self.path = path
+        self.config = config
+        self.intervals = intervals  # IntervalRecorder whose position is saved along, if any
+        self.every_cycles = every_cycles
+        self.every_refs = every_refs
+        self.cores = None
+        self.shared_bus = None
+        self.next_cycle = every_cycles
+        self.next_refs = every_refs
+
+    def attach(self, cores, shared_bus, global_cycle=0):
+        self.cores = cores
+        self.shared_bus = shared_bus
+        if self.every_cycles:
+            self.next_cycle = global_cycle + self.every_cycles
+        if self.every_refs:
+            self.next_refs = self.references() + self.every_refs
+
+    def references(self):
+        return sum(core.loads + core.stores for core in self.cores)
+
+    def on_cycle(self, global_cycle):
+        due = False
+        if self.every_cycles and global_cycle >= self.next_cycle:
+            due = True
+            self.next_cycle = global_cycle + self.every_cycles
+        if self.every_refs:
+            references = self.references()
+            if references >= self.next_refs:
+                due = True
+                self.next_refs = references + self.every_refs
+        if due:
+            state = snapshot(self.cores, self.shared_bus, global_cycle, self.config)
+            if self.intervals is not None:
+                state['intervals'] = self.intervals.state()
+            save(self.path, state)
@@ -1,14 +1,184 @@
 import argparse
-from bus import Bus
-from core import Core
+import cProfile
+import contextlib
+import csv
+import heapq
+import json
+import os
+import sys
+import checkpoint
+import fastpath
+import memo
+from intervals import IntervalRecorder
+import sampling
+from bus import Bus, print_report as print_bus_report
+from cache import address_bits
+from core import Core, DecodedCore, FastPathCore, print_report as print_core_report
+from preprocess import load_preprocessed
+from profiler import Profiler
+from traces import discover_traces, load_trace
+
+
+def run(cores, shared_bus, on_cycle=None, stop=None):
+    # Event-driven clock: a min-heap of (ready cycle, core id) lets the global
+    # cycle jump straight to the next cycle in which some core can issue,
+    # instead of ticking through cycles in which every core is stalled.
+    # Snoops only ever delay a core, so stale heap entries are re-queued lazily.
+    # A core also stops issuing once stop(core) is true, see sampling.detailed.
+    ready = [(core.ready_cycle(), core.core_id) for core in cores
+             if not core.is_empty() and (stop is None or not stop(core))]
+    heapq.heapify(ready)
+
+    while ready:
+        global_cycle = ready[0][0]
+        issued = []
+        while ready and ready[0][0] == global_cycle:
+            _, core_id = heapq.heappop(ready)
+            core = cores[core_id]
+            ready_cycle = core.ready_cycle()
+            if ready_cycle > global_cycle:
+                heapq.heappush(ready, (ready_cycle, core_id))
+                continue
+            # entries pop in core id order, matching the original issue order
+            core.execute(global_cycle)
+            issued.append(core)
+
+        if shared_bus.queue:
+            shared_bus.drain(cores)
+
+        for core in issued:
+            if not core.is_empty() and (stop is None or not stop(core)):
+                heapq.heappush(ready, (core.ready_cycle(), core.core_id))
+
+        if on_cycle is not None:
+            on_cycle(global_cycle)
+
+
+class SimulationResult:
+    def __init__(self, config, cores, bus):
+        self.config = config
+        self.cores = cores  # per-core Core.stats() dicts
+        self.bus = bus  # Bus.stats() dict
+        self.overall_cycles = max((stats['cycles'] for stats in cores), default=0)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['config'], data['cores'], data['bus'])
+
+    def as_dict(self):
+        return {
+            'config': dict(self.config),
+            'overall_cycles': self.overall_cycles,
+            'cores': [dict(stats) for stats in self.cores],
+            'bus': dict(self.bus),
+        }
+
+    def as_row(self):
+        # Flat single-row view used for CSV tables
+        row = dict(self.config)
+        row['overall_cycles'] = self.overall_cycles
+        for stats in self.cores:
+            prefix = f"core{stats['core_id']}_"
+            for key, value in stats.items():
+                if key != 'core_id':
+                    row[prefix + key] = value
+        row.update(self.bus)
+        return row
+
+    def output(self):
+        print('===== END OF EXECUTION =====')
+        for stats in self.cores:
+            print_core_report(stats)
+        print("Overall execution cycles:", self.overall_cycles)
+        print_bus_report(self.bus)
+        print('\n')
+
+
+def simulate(protocol, traces, cache_size, associativity, block_size, profiler=None,
+             checkpointer=None, resume_state=None, core_class=Core, intervals=None):
+    # traces holds one iterable of records per core in the format core_class
+    # reads; when resuming they must already start at the checkpointed
+    # positions (checkpoint.seek)
+    shared_bus = Bus()
+    cores = [
+        core_class(i, cache_size, associativity, block_size, protocol, trace_data, shared_bus)
+        for i, trace_data in enumerate(traces)
+    ]
+    if resume_state is not None:
+        checkpoint.restore(resume_state, cores, shared_bus)
+    if profiler is not None:
+        profiler.instrument(cores, shared_bus)
+    start_cycle = resume_state['global_cycle'] if resume_state else 0
+    hooks = []
+    # rows are recorded before a checkpoint of the same cycle, which then covers them
+    if intervals is not None:
+        intervals.attach(cores, shared_bus, start_cycle, resume_state.get('intervals') if resume_state else None)
+        hooks.append(intervals.on_cycle)
+    if checkpointer is not None:
+        checkpointer.attach(cores, shared_bus, start_cycle)
+        hooks.append(checkpointer.on_cycle)
+    on_cycle = None
+    if len(hooks) == 1:
+        on_cycle = hooks[0]
+    elif hooks:
+        def on_cycle(global_cycle):
+            for hook in hooks:
+                hook(global_cycle)
+    run(cores, shared_bus, on_cycle)
+    if intervals is not None:
+        intervals.close(max((core.cycles for core in cores), default=start_cycle))
+    config = {
+        'protocol': protocol,
+        'cache_size': cache_size,
+        'associativity': associativity,
+        'block_size': block_size,
+    }
+    return SimulationResult(config, [core.stats() for core in cores], shared_bus.stats())
+
+
+def load_traces(paths, stream=False, bits=None):
+    # bits is (offset bits, index bits) to load traces pre-decoded for that geometry
+    if bits is not None:
+        return [load_preprocessed(path, *bits) for path in paths]
+    return [load_trace(path, stream) for path in paths]
+
+
+def write_results(results, out, fmt):
+    if fmt == 'json':
+        json.dump([result.as_dict() for result in results], out, indent=2)
+        out.write('\n')
+    elif fmt == 'csv':
+        rows = [result.as_row() for result in results]
+        if rows:
+            writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        for result in results:
+            result.output()
+
+
+def finish(result, fmt, profiler=None, cprofile=None, profile_output=None):
+    if cprofile is not None:
+        cprofile.disable()
+        cprofile.dump_stats(profile_output)
+    write_results([result], sys.stdout, fmt)
+    if profiler is not None:
+        # keep machine-readable reports clean on stdout
+        profiler.output(sys.stdout if fmt == 'text' else sys.stderr)
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "sweep":
+        import sweep
+        sweep.main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description="Cache Coherence Simulator")
     parser.add_argument(
         "protocol", choices=["MESI", "Dragon"], help="Coherence protocol"
     )
-    parser.add_argument("input_file", help="Input benchmark name")
+    parser.add_argument("input_file", help="Input benchmark name, trace directory or glob")
     parser.add_argument(
         "cache_size", type=int, default=4096, help="Cache size in bytes"
     )
@@ -16,48 +186,182 @@ def main():
         "associativity", type=int, default=2, help="Cache associativity"
     )
     parser.add_argument("block_size", type=int, default=32, help="Block size in bytes")
+    parser.add_argument(
+        "--cores", type=int, default=None, help="Number of cores (default: one per discovered trace file)"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="Read text traces lazily instead of loading them up front"
+    )
+    parser.add_argument(
+        "--preprocess", action="store_true",
+        help="Use traces pre-decoded for this geometry, cached on disk across runs"
+    )
+    parser.add_argument(
+        "--private-fast-path", action="store_true",
+        help="Simulate sets holding only one core's private blocks ahead of the coherence run"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="Worker processes for the --private-fast-path pass over the cores' private references; "
+             "only matters the first time, as later runs reuse its cached result"
+    )
+    parser.add_argument(
+        "--format", choices=["text", "json", "csv"], default="text", help="Report format"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Report time spent in each simulator phase"
+    )
+    parser.add_argument(
+        "--profile-output", help="Also run under cProfile and dump pstats to this file"
+    )
+    parser.add_argument(
+        "--checkpoint", help="Checkpoint file to write periodically (and to resume from)"
+    )
+    parser.add_argument(
+        "--checkpoint-every-cycles", type=int, help="Checkpoint every N global cycles"
+    )
+    parser.add_argument(
+        "--checkpoint-every-refs", type=int, help="Checkpoint every N memory references"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Continue from the state saved in --checkpoint"
+    )
+    parser.add_argument(
+        "--intervals", help="Stream per-interval core and bus statistics to this CSV file"
+    )
+    parser.add_argument(
+        "--interval-cycles", type=int, help="Write an --intervals row every N global cycles"
+    )
+    parser.add_argument(
+        "--interval-refs", type=int, help="Write an --intervals row every N memory references"
+    )
+    parser.add_argument(
+        "--sample-period", type=int,
+        help="Estimate from a detailed window at the start of every N records per core instead of a full run"
+    )
+    parser.add_argument(
+        "--sample-window", type=int, default=1000, help="Records per core in each detailed window (default: 1000)"
+    )
+    parser.add_argument(
+        "--sample-warmup", type=int,
+        help="Records per core functionally warmed before each window (default: twice the window)"
+    )
+    parser.add_argument(
+        "--sample-confidence", type=float, default=0.95, help="Confidence level of the estimates (default: 0.95)"
+    )
+    parser.add_argument(
+        "--sample-error", type=float, default=0.05,
+        help="Target relative error of the overall cycles; a shorter period is suggested if missed (default: 0.05)"
+    )
+    parser.add_argument(
+        "--no-result-cache", action="store_true", help="Always simulate, ignoring results cached from earlier runs"
+    )
+    parser.add_argument(
+        "--result-cache-mb", type=int, default=memo.MAX_BYTES >> 20,
+        help=f"Size bound of the result cache in {memo.RESULT_DIR} (default: %(default)s MB)"
+    )
     args = parser.parse_args()
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    if args.preprocess and args.private_fast_path:
+        parser.error("--preprocess cannot be combined with --private-fast-path")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.intervals and not (args.interval_cycles or args.interval_refs):
+        parser.error("--intervals requires --interval-cycles or --interval-refs")
+    if args.sample_period is not None:
+        if args.preprocess or args.private_fast_path or args.checkpoint or args.intervals:
+            parser.error("--sample-period cannot be combined with --preprocess, --private-fast-path, "
+                         "--checkpoint or --intervals")
+        if args.sample_period <= args.sample_window:
+            parser.error("--sample-period must be longer than --sample-window")
 
-    protocol = args.protocol
-    input_file = args.input_file
-    cache_size = args.cache_size
-    associativity = args.associativity
-    block_size = args.block_size
-    shared_bus = Bus()
+    profiler = Profiler() if args.profile or args.profile_output else None
+    cprofile = None
+    if args.profile_output:
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    paths = discover_traces(args.input_file, args.cores)
+    # A finished run is reused as long as the traces, configuration and simulator
+    # sources are unchanged; profiled, checkpointed and recorded runs always simulate
+    result_cache = None
+    if not (args.no_result_cache or profiler is not None or args.checkpoint or args.sample_period
+            or args.intervals):
+        result_cache = memo.ResultCache(max_bytes=args.result_cache_mb << 20)
+        key = memo.trace_key(paths, {
+            'protocol': args.protocol,
+            'cache_size': args.cache_size,
+            'associativity': args.associativity,
+            'block_size': args.block_size,
+        })
+        cached = result_cache.get(key)
+        if cached is not None:
+            write_results([SimulationResult.from_dict(cached)], sys.stdout, args.format)
+            return
+
+    if args.sample_period is not None:
+        with profiler.timer('trace load') if profiler is not None else contextlib.nullcontext():
+            traces = load_traces(paths, args.stream)
+        result = sampling.simulate_sampled(
+            args.protocol, traces, args.cache_size, args.associativity, args.block_size, args.sample_period,
+            args.sample_window, args.sample_warmup, args.sample_confidence, args.sample_error, profiler
+        )
+        finish(result, args.format, profiler, cprofile, args.profile_output)
+        return
+
+    # Load the trace for each core, memory-mapping it if it has been converted
+    bits = None
+    if args.preprocess:
+        bits = address_bits(args.cache_size, args.associativity, args.block_size)
+    with profiler.timer('trace load') if profiler is not None else contextlib.nullcontext():
+        if args.private_fast_path:
+            traces = fastpath.load(paths, args.protocol, args.cache_size, args.associativity, args.block_size,
+                                   jobs=args.jobs)
+        else:
+            traces = load_traces(paths, args.stream, bits)
+
+    config = {
+        'protocol': args.protocol,
+        'cache_size': args.cache_size,
+        'associativity': args.associativity,
+        'block_size': args.block_size,
+        'traces': [os.path.abspath(path) for path in paths],
+        'preprocess': args.preprocess,
+        'private_fast_path': args.private_fast_path,
+    }
+    resume_state = None
+    if args.resume:
+        resume_state = checkpoint.load(args.checkpoint)
+        if resume_state['config'] != config:
+            parser.error(f"{args.checkpoint} was written for a different configuration")
+        if args.intervals and 'intervals' not in resume_state:
+            parser.error(f"{args.checkpoint} was written without --intervals, so its rows cannot be continued")
+        if (args.intervals and os.path.exists(args.intervals)
+                and os.path.getsize(args.intervals) < resume_state['intervals']['offset']):
+            parser.error(f"{args.intervals} is shorter than when {args.checkpoint} was written")
+        traces = [checkpoint.seek(trace, state['position']) for trace, state in zip(traces, resume_state['cores'])]
+    intervals = None
+    if args.intervals:
+        intervals = IntervalRecorder(args.intervals, args.interval_cycles, args.interval_refs)
+    checkpointer = None
+    if args.checkpoint and (args.checkpoint_every_cycles or args.checkpoint_every_refs):
+        checkpointer = checkpoint.Checkpointer(
+            args.checkpoint, config, args.checkpoint_every_cycles, args.checkpoint_every_refs, intervals
+        )
+
+    core_class = Core
+    if args.preprocess:
+        core_class = DecodedCore
+    elif args.private_fast_path:
+        core_class = FastPathCore
+    result = simulate(args.protocol, traces, args.cache_size, args.associativity, args.block_size, profiler,
+                      checkpointer, resume_state, core_class, intervals)
+
+    if result_cache is not None:
+        result_cache.put(key, result.as_dict())
 
-    cores = []
-    for i in range(4):
-        # Read and process the trace file for each core
-        with open(f"./{input_file}_four/{input_file}_{i}.data", 'r') as file:
-            trace_data = file.readlines()  # Read the trace data
-        core = Core(i, cache_size, associativity, block_size, protocol, trace_data, shared_bus)
-        cores.append(core)
-
-    global_cycle = 0
-
-    has_instr = True
-    while has_instr:
-        has_instr = False
-        for core in cores:
-            if not core.is_empty():
-                has_instr = True
-                core.execute(global_cycle)
-
-        while shared_bus.queue:
-            transaction = shared_bus.get_next_transaction()
-            for core in cores:
-                core.cycles += core.protocol.snoop(transaction)
-        global_cycle += 1
-
-    print('===== END OF EXECUTION =====')
-    overall_cycles = 0
-    for core in cores:
-        core.output()
-        if core.cycles > overall_cycles:
-            overall_cycles = core.cycles
-    print("Overall execution cycles:", overall_cycles)
-    shared_bus.output()
-    print('\n')
+    finish(result, args.format, profiler, cprofile, args.profile_output)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
-from collections import deque
 from cache import Cache
 from protocol import MESI, Dragon
 
+# labels of references simulated ahead of time by fastpath.py
+PRIVATE_LOAD = 3
+PRIVATE_STORE = 4
+
 
 class Core:
     def __init__(self, core_id, cache_size, associativity, block_size, protocol, data, shared_bus):
@@ -12,27 +15,36 @@ class Core:
             self.protocol = MESI(core_id, self.cache, shared_bus)
         elif protocol == "Dragon":
             self.protocol = Dragon(core_id, self.cache, shared_bus)
-        self.data = deque(data)
+        shared_bus.attach(core_id, self.cache)
+        # data is an iterable of (label, value) records, see traces.py
+        self.records = iter(data)
+        self.next_record = next(self.records, None)
+        self.position = 0  # records consumed so far
         self.cycles = 0
         self.compute_cycles = 0
         self.loads = 0
         self.stores = 0
         self.idle_cycles = 0
+        self.next_issue = 0  # a core issues at most one instruction per global cycle
 
     def is_empty(self):
-        return not self.data
+        return self.next_record is None
+
+    def ready_cycle(self):
+        # earliest global cycle at which this core can issue its next instruction
+        return max(self.cycles, self.next_issue)
 
     def execute(self, global_cycle):
         if global_cycle < self.cycles:
             return
 
-        line = self.data.popleft()
-        label, value = line.split()
-        label = int(label)
-        value = int(value, 16)
+        self.next_issue = global_cycle + 1
+        label, value = self.next_record
+        self.next_record = next(self.records, None)
+        self.position += 1
 
         if label == 0 or label == 1:  # Load or store instructions
-            address = bin(value)[2:].zfill(32)
+            address = value
             if label == 0:
                 self.loads += 1
                 # self.cycles += 1
@@ -46,11 +58,107 @@ class Core:
             self.compute_cycles += value
             self.cycles += value
 
+    def advance(self):
+        # consume the next record without simulating it, counting only its
+        # instructions, see sampling.py
+        label, value = record = self.next_record
+        self.next_record = next(self.records, None)
+        self.position += 1
+        if label == 0:
+            self.loads += 1
+        elif label == 1:
+            self.stores += 1
+        elif label == 2:
+            self.compute_cycles += value
+        return record
+
+    def skip(self, count):
+        for _ in range(count):
+            if self.next_record is None:
+                break
+            self.advance()
+
+    def stats(self):
+        stats = {
+            'core_id': self.core_id,
+            'cycles': self.cycles,
+            'compute_cycles': self.compute_cycles,
+            'loads': self.loads,
+            'stores': self.stores,
+            'idle_cycles': self.cycles - self.compute_cycles,
+        }
+        stats.update(self.cache.stats())
+        return stats
+
     def output(self):
-        print('Core: ', self.core_id)
-        print('Execution Cycles:', self.cycles)
-        print('Compute Cycles:', self.compute_cycles)
-        print('Load Instructions:', self.loads)
-        print('Store Instructions:', self.stores)
-        print('Idle Cycles:', self.cycles - self.compute_cycles)
-        print('Cache Miss Rate:', self.cache.miss / (self.cache.miss + self.cache.hit) * 100, '%')
+        print_report(self.stats())
+
+
+class DecodedCore(Core):
+    # Consumes preprocess.py records (label, value, count, index, tag): memory
+    # references carry their set index and tag, and a compute record may stand
+    # for a run of count consecutive compute records.
+    def execute(self, global_cycle):
+        if global_cycle < self.cycles:
+            return
+
+        label, value, count, index, tag = self.next_record
+        self.next_record = next(self.records, None)
+        self.position += 1
+        # a run of count compute records takes count issue slots, so the next
+        # instruction issues exactly when it would have after the unfolded run
+        self.next_issue = global_cycle + count
+
+        if label == 0:
+            self.loads += 1
+            self.cycles += self.protocol.PrRd(value, global_cycle, index, tag)
+        elif label == 1:
+            self.stores += 1
+            self.cycles += self.protocol.PrWr(value, global_cycle, index, tag)
+        elif label == 2:
+            self.compute_cycles += value
+            self.cycles += value
+
+
+class FastPathCore(Core):
+    # Consumes fastpath.py records (label, value, hit, flushes). References to
+    # sets that only ever hold this core's private blocks were simulated ahead
+    # of time: value is their cycle cost, hit and flushes their cache and bus effect.
+    def execute(self, global_cycle):
+        if global_cycle < self.cycles:
+            return
+
+        self.next_issue = global_cycle + 1
+        label, value, hit, flushes = self.next_record
+        self.next_record = next(self.records, None)
+        self.position += 1
+
+        if label == PRIVATE_LOAD or label == PRIVATE_STORE:
+            if label == PRIVATE_LOAD:
+                self.loads += 1
+            else:
+                self.stores += 1
+            self.cache.hit += hit
+            self.cache.miss += 1 - hit
+            self.cycles += value
+            for _ in range(flushes):
+                self.protocol.shared_bus.add_transaction(self.protocol.flush)
+        elif label == 0:
+            self.loads += 1
+            self.cycles += self.protocol.PrRd(value, global_cycle)
+        elif label == 1:
+            self.stores += 1
+            self.cycles += self.protocol.PrWr(value, global_cycle)
+        elif label == 2:
+            self.compute_cycles += value
+            self.cycles += value
+
+
+def print_report(stats):
+    print('Core: ', stats['core_id'])
+    print('Execution Cycles:', stats['cycles'])
+    print('Compute Cycles:', stats['compute_cycles'])
+    print('Load Instructions:', stats['loads'])
+    print('Store Instructions:', stats['stores'])
+    print('Idle Cycles:', stats['idle_cycles'])
+    print('Cache Miss Rate:', stats['miss_rate'], '%')
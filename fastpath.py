@@ -0,0 +1,108 @@
+import hashlib
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import memo
+from bus import Bus
+from cache import Cache
+from core import PRIVATE_LOAD, PRIVATE_STORE
+from preprocess import CACHE_DIR, MAX_BYTES, evict, read_decoded, write_decoded
+from protocol import MESI, Dragon
+from traces import load_trace, trace_digest
+
+SHARED = -1
+COLUMNS = ('B', 'Q', 'B', 'B')  # label, value, hit, flushes
+
+
+def touched_blocks(path, offset_bits):
+    # the set of block addresses one core's trace references
+    touched = set()
+    for label, value in load_trace(path, stream=True):
+        if label == 0 or label == 1:
+            touched.add(value >> offset_bits)
+    return touched
+
+
+def classify(blocks):
+    # block address -> the only core touching it, or SHARED
+    owners = {}
+    for core_id, touched in enumerate(blocks):
+        for block in touched:
+            if owners.setdefault(block, core_id) != core_id:
+                owners[block] = SHARED
+    return owners
+
+
+def private_trace(path, core_id, mixed, protocol, cache_size, associativity, block_size, output):
+    # writes to output one core's trace with its references to sets outside
+    # mixed run ahead; the worker writes it itself rather than sending it back
+    cache = Cache(cache_size, associativity, block_size)
+    offset_bits, index_mask = cache.offset_bits, cache.index_mask
+    bus = Bus()
+    shadow = MESI(core_id, cache, bus) if protocol == "MESI" else Dragon(core_id, cache, bus)
+
+    columns = [array(code) for code in COLUMNS]
+    labels, values, hits, flushes = columns
+    for position, (label, value) in enumerate(load_trace(path, stream=True)):
+        if (label == 0 or label == 1) and (value >> offset_bits) & index_mask not in mixed:
+            before = cache.hit
+            if label == 0:
+                cost = shadow.PrRd(value, position)
+            else:
+                cost = shadow.PrWr(value, position)
+            labels.append(PRIVATE_LOAD if label == 0 else PRIVATE_STORE)
+            values.append(cost)
+            hits.append(cache.hit - before)
+            flushes.append(sum(1 for transaction in bus.queue if transaction.address is None))
+            bus.queue.clear()
+        else:
+            labels.append(label)
+            values.append(value)
+            hits.append(0)
+            flushes.append(0)
+    write_decoded(output, columns, offset_bits, cache.index_bits)
+    return len(labels)
+
+
+def build(paths, outputs, protocol, cache_size, associativity, block_size, jobs=1):
+    # A set that only ever holds one core's private blocks is never snooped and
+    # its contents depend on that core's references alone, so those references
+    # are run once here through a private copy of the protocol and replayed
+    # from their recorded cost, hit and flush count. Everything else is left
+    # for the full coherence path. Cores are independent until then, so with
+    # jobs > 1 each one is scanned and run ahead in its own process.
+    geometry = Cache(cache_size, associativity, block_size)
+    offset_bits, index_mask = geometry.offset_bits, geometry.index_mask
+    pool = ProcessPoolExecutor(max_workers=min(jobs, len(paths))) if jobs > 1 else None
+    run = pool.map if pool is not None else map
+    try:
+        n = len(paths)
+        blocks = list(run(touched_blocks, paths, [offset_bits] * n))
+        owners = classify(blocks)
+        mixed = [{block & index_mask for block in touched if owners[block] == SHARED} for touched in blocks]
+        return list(run(private_trace, paths, range(n), mixed, [protocol] * n, [cache_size] * n,
+                        [associativity] * n, [block_size] * n, outputs))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def load(paths, protocol, cache_size, associativity, block_size, cache_dir=CACHE_DIR, jobs=1, max_bytes=MAX_BYTES):
+    # The ahead-of-time pass costs about as much as simulating the private
+    # references, so its output is cached on disk keyed by every core's trace
+    # content, the protocol and the geometry. The files hold simulated costs,
+    # so the simulator sources (fastpath.py among them) are part of the key.
+    key = hashlib.sha256(memo.source_hash().encode())
+    for path in paths:
+        key.update(trace_digest(path).encode())
+    key.update(f"{protocol}-{cache_size}-{associativity}-{block_size}".encode())
+    cached = [os.path.join(cache_dir, f"{key.hexdigest()}-fast-{i}.pre") for i in range(len(paths))]
+    if all(os.path.exists(path) for path in cached):
+        for path in cached:
+            os.utime(path)
+        return [read_decoded(path, COLUMNS) for path in cached]
+    build(paths, cached, protocol, cache_size, associativity, block_size, jobs)
+    traces = [read_decoded(path, COLUMNS) for path in cached]
+    evict(cache_dir, '.pre', max_bytes)
+    return traces
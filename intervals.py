@@ -0,0 +1,112 @@
+import csv
+import os
+
+BUS_FIELDS = ('traffic_bytes', 'invalidations', 'updates')
+# what a checkpoint keeps of a recorder so a resumed run continues its rows
+STATE_FIELDS = ('start_cycle', 'previous', 'next_cycle', 'next_refs', 'queue_depth', 'bus_drains')
+
+
+def truncate_to(path, offset):
+    # drops whatever a resumed run's file got after its checkpoint, including
+    # a row that was only partly written when the run stopped
+    with open(path, 'rb+') as file:
+        if file.seek(0, os.SEEK_END) < offset:
+            raise ValueError(f"{path} is shorter than when it was checkpointed")
+        file.truncate(offset)
+
+
+class IntervalRecorder:
+    # Appends one CSV row per interval of every_cycles global cycles or
+    # every_refs memory references, holding only the previous row in memory.
+    # Counters are deltas over the interval; queue_depth is the deepest the bus
+    # queue got when draining and bus_drains how many cycles used the bus.
+
+    def __init__(self, path, every_cycles=None, every_refs=None, buffer_size=1 << 20):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.file = None
+        self.writer = None
+        self.every_cycles = every_cycles
+        self.every_refs = every_refs
+        self.cores = None
+        self.shared_bus = None
+        self.previous = None
+        self.queue_depth = 0
+        self.bus_drains = 0
+
+    def attach(self, cores, shared_bus, global_cycle=0, state=None):
+        # state is what state() returned for the checkpoint a run resumes from
+        self.cores = cores
+        self.shared_bus = shared_bus
+        drain = shared_bus.drain
+
+        def recorded_drain(cores):
+            if len(shared_bus.queue) > self.queue_depth:
+                self.queue_depth = len(shared_bus.queue)
+            self.bus_drains += 1
+            drain(cores)
+        shared_bus.drain = recorded_drain
+
+        header = ['start_cycle', 'end_cycle', 'references']
+        for core in cores:
+            header += [f"core{core.core_id}_{name}" for name in ('hits', 'misses', 'idle_cycles')]
+        header += list(BUS_FIELDS) + ['queue_depth', 'bus_drains']
+        resumed = state is not None and state['offset'] > 0 and os.path.exists(self.path)
+        if resumed:
+            truncate_to(self.path, state['offset'])
+        self.file = open(self.path, 'a' if resumed else 'w', newline='', buffering=self.buffer_size)
+        self.writer = csv.writer(self.file)
+        if not resumed:
+            self.writer.writerow(header)
+        if state is not None:
+            for field in STATE_FIELDS:
+                setattr(self, field, state[field])
+            return
+        self.start_cycle = global_cycle
+        self.previous = self.counters()
+        self.next_cycle = global_cycle + self.every_cycles if self.every_cycles else None
+        self.next_refs = self.previous[0] + self.every_refs if self.every_refs else None
+
+    def state(self):
+        # flushed first, so the rows a resumed run keeps are all on disk and
+        # offset is where they end
+        self.file.flush()
+        state = {field: getattr(self, field) for field in STATE_FIELDS}
+        state['offset'] = self.file.tell()
+        return state
+
+    def counters(self):
+        values = [sum(core.loads + core.stores for core in self.cores)]
+        for core in self.cores:
+            values += [core.cache.hit, core.cache.miss, core.cycles - core.compute_cycles]
+        values += [getattr(self.shared_bus, field) for field in BUS_FIELDS]
+        return values
+
+    def on_cycle(self, global_cycle):
+        due = False
+        if self.every_cycles and global_cycle >= self.next_cycle:
+            due = True
+            self.next_cycle = global_cycle + self.every_cycles
+        if self.every_refs and sum(core.loads + core.stores for core in self.cores) >= self.next_refs:
+            due = True
+        if due:
+            self.record(global_cycle)
+
+    def record(self, global_cycle):
+        current = self.counters()
+        row = [self.start_cycle, global_cycle]
+        row += [now - before for now, before in zip(current, self.previous)]
+        row += [self.queue_depth, self.bus_drains]
+        self.writer.writerow(row)
+        self.previous = current
+        self.start_cycle = global_cycle
+        self.queue_depth = 0
+        self.bus_drains = 0
+        if self.every_refs:
+            self.next_refs = current[0] + self.every_refs
+
+    def close(self, global_cycle=None):
+        # records the last partial interval, if anything happened in it
+        if self.previous is not None and global_cycle is not None and self.counters() != self.previous:
+            self.record(global_cycle)
+        self.file.close()
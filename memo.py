@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from preprocess import CACHE_DIR, evict
+from traces import trace_digest
+
+# Results depend on the traces, the configuration and the simulator itself, so
+# the sources of the simulation engine are part of every key. Preprocessed and
+# fast-path runs share keys with plain runs, so their trace readers count too.
+SOURCES = ('protocol.py', 'cache.py', 'bus.py', 'core.py', 'coherence.py', 'traces.py', 'preprocess.py',
+           'fastpath.py')
+RESULT_DIR = os.path.join(CACHE_DIR, 'results')
+MAX_BYTES = 64 << 20
+
+_source_hash = None
+
+
+def source_hash():
+    global _source_hash
+    if _source_hash is None:
+        digest = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in SOURCES:
+            with open(os.path.join(here, name), 'rb') as file:
+                digest.update(file.read())
+        _source_hash = digest.hexdigest()
+    return _source_hash
+
+
+def result_key(digests, config):
+    # digests are the trace_digest() of each core's trace, in core order
+    key = {'source': source_hash(), 'traces': list(digests), 'config': config}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def trace_key(paths, config):
+    return result_key([trace_digest(path) for path in paths], config)
+
+
+class ResultCache:
+    # One JSON file per result; mtime doubles as the last-use time for LRU eviction
+    def __init__(self, directory=RESULT_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path) as file:
+                result = json.load(file)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return result
+
+    def put(self, key, result):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(result, file)
+        os.replace(tmp, self.path(key))
+        self.evict()
+
+    def evict(self):
+        evict(self.directory, '.json', self.max_bytes)
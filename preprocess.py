@@ -0,0 +1,146 @@
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+from cache import address_bits
+from traces import discover_traces, load_trace, trace_digest
+
+# Decoded trace format: a header followed by parallel native-endian arrays of
+# labels, values, run counts, set indexes and tags, each padded to 8 bytes.
+MAGIC = b'CCPP'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIQ')  # magic, version, offset bits, index bits, record count
+COLUMNS = ('B', 'Q', 'I', 'Q', 'Q')  # label, value, count, index, tag
+CACHE_DIR = os.environ.get('COHERENCE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'coherence'))
+# size bound of the decoded traces kept in CACHE_DIR
+MAX_BYTES = int(os.environ.get('COHERENCE_CACHE_MB', 1024)) << 20
+
+
+def decode(records, offset_bits, index_bits):
+    columns = [array(code) for code in COLUMNS]
+    labels, values, counts, indexes, tags = columns
+    index_mask = (1 << index_bits) - 1
+    tag_shift = offset_bits + index_bits
+    for label, value in records:
+        # Fold a compute record into the compute run before it. Only records of
+        # at least one cycle are folded: then a run of count records is ready
+        # exactly max(cycles, issue cycle + count), see DecodedCore.execute.
+        if label == 2 and value >= 1 and labels and labels[-1] == 2:
+            values[-1] += value
+            counts[-1] += 1
+            continue
+        labels.append(label)
+        values.append(value)
+        counts.append(1)
+        if label == 0 or label == 1:
+            indexes.append((value >> offset_bits) & index_mask)
+            tags.append(value >> tag_shift)
+        else:
+            indexes.append(0)
+            tags.append(0)
+    return columns
+
+
+class DecodedTrace:
+    def __init__(self, columns, count, source=None):
+        self.columns = columns
+        self.count = count
+        self.source = source  # mmap backing the columns, if any
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self, start=0):
+        return zip(*(column[start:self.count] for column in self.columns))
+
+
+def write_decoded(path, columns, offset_bits, index_bits):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, offset_bits, index_bits, len(columns[0])))
+        for column in columns:
+            column.tofile(file)
+            file.write(b'\0' * (-file.tell() % 8))
+    os.replace(tmp, path)
+
+
+def read_decoded(path, codes=COLUMNS):
+    with open(path, 'rb') as file:
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, _, _, count = HEADER.unpack_from(mm)
+    if magic != MAGIC or version != VERSION:
+        mm.close()
+        raise ValueError(f"{path}: not a version {VERSION} decoded trace")
+    view = memoryview(mm)
+    columns = []
+    offset = HEADER.size + (-HEADER.size % 8)
+    for code in codes:
+        size = count * array(code).itemsize
+        columns.append(view[offset:offset + size].cast(code))
+        offset += size + (-size % 8)
+    return DecodedTrace(columns, count, mm)
+
+
+def evict(directory, suffix, max_bytes):
+    # Removes the least recently used files ending in suffix until the rest fit
+    # in max_bytes; readers refresh a file's mtime whenever they reuse it
+    entries = []
+    total = 0
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if entry.name.endswith(suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def load_preprocessed(path, offset_bits, index_bits, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    # Decoded traces are cached on disk by trace content and address split, so
+    # every run and protocol at the same geometry skips decoding entirely
+    cached = os.path.join(cache_dir, f"{trace_digest(path)}-{offset_bits}-{index_bits}.pre")
+    if os.path.exists(cached):
+        os.utime(cached)
+        return read_decoded(cached)
+    columns = decode(load_trace(path, stream=True), offset_bits, index_bits)
+    write_decoded(cached, columns, offset_bits, index_bits)
+    # mapped before evicting, so even a file larger than the bound serves this run
+    trace = read_decoded(cached)
+    evict(cache_dir, '.pre', max_bytes)
+    return trace
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-decode traces for a cache geometry")
+    parser.add_argument("input_file", help="Input benchmark name, trace directory or glob")
+    parser.add_argument("cache_size", type=int, help="Cache size in bytes")
+    parser.add_argument("associativity", type=int, help="Cache associativity")
+    parser.add_argument("block_size", type=int, help="Block size in bytes")
+    parser.add_argument("--cores", type=int, default=None, help="Number of cores")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"Decoded trace cache (default: {CACHE_DIR})")
+    args = parser.parse_args()
+
+    offset_bits, index_bits = address_bits(args.cache_size, args.associativity, args.block_size)
+    for path in discover_traces(args.input_file, args.cores):
+        trace = load_preprocessed(path, offset_bits, index_bits, args.cache_dir)
+        print(f"{path}: {len(trace)} decoded records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def timed(func, seconds, calls, name):
+    perf_counter = time.perf_counter
+
+    def wrapper(*args):
+        start = perf_counter()
+        result = func(*args)
+        seconds[name] += perf_counter() - start
+        calls[name] += 1
+        return result
+    return wrapper
+
+
+class Profiler:
+    # Instruments a single simulation by wrapping methods on its Core, Protocol
+    # and Bus instances, so runs without a profiler pay nothing for it.
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.queue_high_water = 0
+        self.transactions = 0
+        self.snoops = 0
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.calls[name] += 1
+
+    def instrument(self, cores, shared_bus):
+        for core in cores:
+            protocol = core.protocol
+            protocol.PrRd = timed(protocol.PrRd, self.seconds, self.calls, 'PrRd')
+            protocol.PrWr = timed(protocol.PrWr, self.seconds, self.calls, 'PrWr')
+            protocol.snoop = timed(protocol.snoop, self.seconds, self.calls, 'snoop')
+        shared_bus.drain = timed(shared_bus.drain, self.seconds, self.calls, 'bus drain')
+
+        add_transaction = shared_bus.add_transaction
+        get_next_transaction = shared_bus.get_next_transaction
+        snoop_targets = shared_bus.snoop_targets
+
+        def add(transaction):
+            add_transaction(transaction)
+            if len(shared_bus.queue) > self.queue_high_water:
+                self.queue_high_water = len(shared_bus.queue)
+
+        def get_next():
+            self.transactions += 1
+            return get_next_transaction()
+
+        def targets(transaction):
+            result = snoop_targets(transaction)
+            self.snoops += len(result)
+            return result
+
+        shared_bus.add_transaction = add
+        shared_bus.get_next_transaction = get_next
+        shared_bus.snoop_targets = targets
+
+    def stats(self):
+        return {
+            'seconds': dict(self.seconds),
+            'calls': dict(self.calls),
+            'queue_high_water': self.queue_high_water,
+            'transactions': self.transactions,
+            'snoops': self.snoops,
+            'snoops_per_transaction': self.snoops / self.transactions if self.transactions else 0.0,
+        }
+
+    def output(self, file=None):
+        print('===== PROFILE =====', file=file)
+        for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1]):
+            calls = self.calls[name]
+            per_call = seconds / calls * 1e6 if calls else 0.0
+            print(f"{name:<12} {seconds:>10.3f}s {calls:>12} calls {per_call:>9.2f}us/call", file=file)
+        print('Bus transactions:', self.transactions, file=file)
+        print('Bus queue high-water mark:', self.queue_high_water, file=file)
+        print('Snoops per transaction:', self.stats()['snoops_per_transaction'], file=file)
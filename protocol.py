@@ -1,394 +1,325 @@
-from enum import Enum
-from bus import Bus, Transaction
-from cache import Cache, CacheBlock
+from collections import namedtuple
+from enum import IntEnum
+from bus import Transaction
+
+BusRd = Transaction.Type.BusRd
+BusRdX = Transaction.Type.BusRdX
+BusUpd = Transaction.Type.BusUpd
+
+# updates of the bus' shared-address table (Bus.S)
+SET_SHARED = 1
+UNSET_SHARED = -1
+
+# cycle cost placeholder for a block supplied by another cache, 2 cycles per word
+CACHE_TO_CACHE = -1
+
+# A processor hit leaves the line in state (None: the line is left alone, not
+# even marked used), queues request for the address and updates Bus.S.
+Hit = namedtuple('Hit', 'state request sharing', defaults=(None, None))
+# A processor miss fills the line in the (state, cycles) of unshared or shared,
+# depending on the address being in Bus.S when the fill happens. Evicting a
+# valid line costs evict_cycles more and applies evict_sharing first; every
+# fill applies fill_sharing and then queues request.
+Miss = namedtuple('Miss', 'request unshared shared evict_cycles evict_sharing fill_sharing', defaults=(0, None, None))
+# A snooped transaction for a line this cache holds leaves it in state (None:
+# unchanged), may flush it for 100 cycles and counts towards the bus statistics.
+Snoop = namedtuple('Snoop', 'state flush private public invalidations updates unshare',
+                   defaults=(None, False, 0, 0, 0, 0, False))
+NO_SNOOP = Snoop()
 
 
 class Protocol:
+    # Subclasses declare a State enum numbered from 0 and transition tables:
+    #   READ_HIT, WRITE_HIT: state -> Hit, with READ_HIT_SHARED and
+    #     WRITE_HIT_SHARED overriding them while the address is in Bus.S
+    #   READ_MISS, WRITE_MISS: Miss
+    #   WRITEBACK: victim states flushed to memory on eviction
+    #   EVICT_UPDATE: victim states that also queue a BusUpd on eviction
+    #   SNOOP: transaction type -> state -> Snoop
+    # __init__ compiles them into tuples indexed by state, so every access is
+    # dispatched with a single lookup instead of a chain of state comparisons.
+    READ_HIT_SHARED = {}
+    WRITE_HIT_SHARED = {}
+    WRITEBACK = frozenset()
+    EVICT_UPDATE = frozenset()
 
     def __init__(self, core_id, cache, shared_bus):
         self.core_id = core_id
         self.cache = cache
         self.shared_bus = shared_bus
+        # Flush transactions carry no address, so one instance per core is reused
+        self.flush = Transaction(core_id, Transaction.Type.Flush)
+        self.read_hit = self.compile_hits(self.READ_HIT, self.READ_HIT_SHARED)
+        self.write_hit = self.compile_hits(self.WRITE_HIT, self.WRITE_HIT_SHARED)
+        self.read_miss = self.compile_miss(self.READ_MISS)
+        self.write_miss = self.compile_miss(self.WRITE_MISS)
+        self.victim = tuple((state in self.WRITEBACK, state in self.EVICT_UPDATE) for state in self.State)
+        self.snoops = {
+            trans_type: tuple(self.SNOOP.get(trans_type, {}).get(state, NO_SNOOP) for state in self.State)
+            for trans_type in Transaction.Type
+        }
+
+    def compile_hits(self, hits, shared_hits):
+        # per state: (depends on sharing, unshared Hit, shared Hit)
+        return tuple((state in shared_hits, hits[state], shared_hits.get(state, hits[state])) for state in self.State)
+
+    def compile_miss(self, miss):
+        def outcome(state, cycles):
+            return state, 2 * self.cache.block_size // 4 if cycles == CACHE_TO_CACHE else cycles
+        unshared = outcome(*miss.unshared)
+        shared = outcome(*miss.shared)
+        return (miss.request, unshared != shared, unshared, shared,
+                miss.evict_cycles, miss.evict_sharing, miss.fill_sharing)
 
     def convert_address(self, address):
-        tag_bits = address[:len(address) - self.cache.index_bits - self.cache.offset_bits]
-        index_bits = address[len(address) - self.cache.index_bits - self.cache.offset_bits:len(
-            address) - self.cache.offset_bits]
-
-        index = int(index_bits, 2)
-        tag = int(tag_bits, 2)
+        index = (address >> self.cache.offset_bits) & self.cache.index_mask
+        tag = address >> self.cache.tag_shift
         return index, tag
 
-    def lru_block_index(self, cache_set):
-        min_lru_index = 0
-        min_lru = cache_set[0].last_used_cycle
-
-        for i, block in enumerate(cache_set[1:], start=1):
-            if block.last_used_cycle < min_lru:
-                min_lru = block.last_used_cycle
-                min_lru_index = i
-
-        return min_lru_index
-
-    def get_empty_block(self, cache_set):
-        for i, block in enumerate(cache_set):
-            if block.state == 'I':
-                return i
-
-        return -1
-
-    def cache_hit(self, cache_set, tag):
-        for i, block in enumerate(cache_set):
-            if block.tag == tag and block.state != 'I':  # hit
-                self.cache.hit += 1
-                return i
-
-        self.cache.miss += 1
-        return -1  # miss
-
-
-class MESI(Protocol):
-    class State(Enum):
-        M = 0
-        E = 1
-        S = 2
-        I = 3
-
-    def __init__(self, core_id, cache, shared_bus):
-        super().__init__(core_id, cache, shared_bus)
-
-    def PrRd(self, address, cycle):
-
-        index, tag = self.convert_address(address)
-        cache_set = self.cache.blocks[index]
-        hit_id = self.cache_hit(cache_set, tag)
-        execution_cycle = 0
-
-        # determine cache hit
-        if hit_id != -1:
-            execution_cycle += 1
-            cache_set[hit_id].last_used_cycle = cycle
-
-        # miss, load from main memory
-        else:
-            empty_block = self.get_empty_block(cache_set)
-
-            if empty_block != -1:  # find empty block in cache set
-
-                if address in self.shared_bus.S:
-                    state = MESI.State.S
-                else:
-                    state = MESI.State.E
-
-                self.shared_bus.set_shared_block(address)
-                cache_set[empty_block] = CacheBlock(tag, state, cycle)
-
-            else:  # no empty block, cache set full, evict a block
-                min_lru_index = self.lru_block_index(cache_set)
-
-                if cache_set[min_lru_index].state == MESI.State.M:
-                    # Write dirty block back to memory
-                    new_transaction = Transaction(self.core_id, Transaction.Type.Flush)
-                    self.shared_bus.add_transaction(new_transaction)
-                    execution_cycle += 100
-
-                # load from main memory
-                if address in self.shared_bus.S:
-                    state = MESI.State.S
-                else:
-                    state = MESI.State.E
-
-                self.shared_bus.set_shared_block(address)
-                cache_set[min_lru_index] = CacheBlock(tag, state, cycle)
-                execution_cycle += 100
-
-            new_transaction = Transaction(self.core_id, Transaction.Type.BusRd, address)
-            self.shared_bus.add_transaction(new_transaction)
-        return execution_cycle
-
-    def PrWr(self, address, cycle):
-
-        index, tag = self.convert_address(address)
-        cache_set = self.cache.blocks[index]
-        execution_cycle = 0
-        hit_id = self.cache_hit(cache_set, tag)
-
-        # determine cache hit
-        if hit_id != -1:
-            execution_cycle += 1
-            if cache_set[hit_id].state == MESI.State.E or cache_set[hit_id].state == MESI.State.M:
-                cache_set[hit_id] = CacheBlock(tag, MESI.State.M, cycle)
-            elif cache_set[hit_id].state == MESI.State.S:
-                cache_set[hit_id] = CacheBlock(tag, MESI.State.M, cycle)
-                new_transaction = Transaction(self.core_id, Transaction.Type.BusRdX, address)
-                self.shared_bus.add_transaction(new_transaction)
-                self.shared_bus.unset_shared_block(address)
-
-        # miss
+    def update_sharing(self, sharing, address):
+        if sharing == SET_SHARED:
+            self.shared_bus.set_shared_block(address)
         else:
-            empty_block = self.get_empty_block(cache_set)
-
-            if empty_block != -1:  # find empty block in cache set
-                cache_set[empty_block] = CacheBlock(tag, MESI.State.M, cycle)
-            else:  # no empty block, cache set full, evict a block
-                min_lru_index = self.lru_block_index(cache_set)
-
-                if cache_set[min_lru_index].state == MESI.State.M:
-                    # Write dirty block back to memory
-                    new_transaction = Transaction(self.core_id, Transaction.Type.Flush)
-                    self.shared_bus.add_transaction(new_transaction)
-                    execution_cycle += 100
-
-                self.shared_bus.unset_shared_block(address)
-                cache_set[min_lru_index] = CacheBlock(tag, MESI.State.M, cycle)
-
-            new_transaction = Transaction(self.core_id, Transaction.Type.BusRdX, address)
-            self.shared_bus.add_transaction(new_transaction)
-        return execution_cycle
+            self.shared_bus.unset_shared_block(address)
+
+    def PrRd(self, address, cycle, index=None, tag=None):
+        # index and tag may come pre-decoded, see preprocess.py
+        cache = self.cache
+        if index is None:
+            index = (address >> cache.offset_bits) & cache.index_mask
+            tag = address >> cache.tag_shift
+        ways = cache.ways[index]
+        way = ways.get(tag, -1)
+        if way == -1:
+            cache.miss += 1
+            return self.miss(self.read_miss, address, cycle, index, tag)
+        cache.hit += 1
+        return self.hit(self.read_hit, address, cycle, cache, ways, index * cache.associativity + way, tag)
+
+    def PrWr(self, address, cycle, index=None, tag=None):
+        # index and tag may come pre-decoded, see preprocess.py
+        cache = self.cache
+        if index is None:
+            index = (address >> cache.offset_bits) & cache.index_mask
+            tag = address >> cache.tag_shift
+        ways = cache.ways[index]
+        way = ways.get(tag, -1)
+        if way == -1:
+            cache.miss += 1
+            return self.miss(self.write_miss, address, cycle, index, tag)
+        cache.hit += 1
+        return self.hit(self.write_hit, address, cycle, cache, ways, index * cache.associativity + way, tag)
+
+    def hit(self, table, address, cycle, cache, ways, line, tag):
+        depends, rule, shared_rule = table[cache.states[line]]
+        if depends and address in self.shared_bus.S:
+            rule = shared_rule
+        state, request, sharing = rule
+        if state is not None:
+            # same as Cache.touch, the line becomes the most recently used
+            cache.states[line] = state
+            cache.last_used[line] = cycle
+            ways.move_to_end(tag)
+            if request is not None:
+                self.shared_bus.add_transaction(Transaction(self.core_id, request, address))
+            if sharing is not None:
+                self.update_sharing(sharing, address)
+        return 1
+
+    def miss(self, table, address, cycle, index, tag):
+        request, depends, unshared, shared, evict_cycles, evict_sharing, fill_sharing = table
+        cache = self.cache
+        bus = self.shared_bus
+        cycles = 0
+        way = cache.empty_way(index)
+        if way == -1:  # no empty block, cache set full, evict the least recently used
+            way = cache.lru_way(index)
+            writeback, update = self.victim[cache.get_state(index, way)]
+            if writeback:
+                bus.add_transaction(self.flush)
+                cycles += 100
+            if update:
+                bus.add_transaction(Transaction(self.core_id, BusUpd, address))
+            if evict_sharing is not None:
+                self.update_sharing(evict_sharing, address)
+            cycles += evict_cycles
+        state, cost = shared if depends and address in bus.S else unshared
+        if fill_sharing is not None:
+            self.update_sharing(fill_sharing, address)
+        cache.fill(index, way, tag, state, cycle)
+        bus.add_transaction(Transaction(self.core_id, request, address))
+        return cycles + cost
 
     def snoop(self, transaction):
         if not transaction:
             return 0
 
-        if not transaction.address:  # Flush request on bus
-            self.shared_bus.traffic_bytes += self.cache.block_size
+        bus = self.shared_bus
+        if transaction.address is None:  # Flush request on bus
+            bus.traffic_bytes += self.cache.block_size
             return 0
 
-        cycles = 0
-        trans_type = transaction.trans_type
+        # the issuer never reacts to its own requests
+        if transaction.core_id == self.core_id:
+            return 0
         address = transaction.address
-
         index, tag = self.convert_address(address)
-        cache_set = self.cache.blocks[index]
-
-        block_to_transit = None
-        if transaction.core_id != self.core_id:
-            # Implement logic for transactions issued by other processors
-            for block in cache_set:
-                if block.tag == tag:
-                    block_to_transit = block
-
-            if block_to_transit is None:
-                return 0
-
-            self.shared_bus.traffic_bytes += self.cache.block_size
-            if trans_type == Transaction.Type.BusRd:
-                if block_to_transit.state == MESI.State.M or block_to_transit.state == MESI.State.E:
-                    self.shared_bus.private_access += 1
-                    block_to_transit.state = MESI.State.S
-                    new_transaction = Transaction(self.core_id, Transaction.Type.Flush)
-                    self.shared_bus.add_transaction(new_transaction)
-                    cycles += 100
+        cache = self.cache
+        way = cache.ways[index].get(tag, -1)
+        if way == -1:
+            return 0
+        line = index * cache.associativity + way
+
+        bus.traffic_bytes += cache.block_size
+        state, flush, private, public, invalidations, updates, unshare = \
+            self.snoops[transaction.trans_type][cache.states[line]]
+        if private:
+            bus.private_access += private
+        if public:
+            bus.public_access += public
+        if invalidations:
+            bus.invalidations += invalidations
+        if updates:
+            bus.updates += updates
+        if state is not None:
+            cache.states[line] = state
+        if unshare:
+            bus.unset_shared_block(address)
+        if flush:
+            bus.add_transaction(self.flush)
+            return 100
+        return 0
+
+    def warm(self, address, write, cycle):
+        # Functional warming for sampled runs (sampling.py): the access leaves the
+        # line and Bus.S as the transition tables say, without timing, bus
+        # transactions or hit counts. Returns the request other caches snoop.
+        index, tag = self.convert_address(address)
+        cache = self.cache
+        bus = self.shared_bus
+        way = cache.lookup(index, tag)
+        if way != -1:
+            depends, rule, shared_rule = (self.write_hit if write else self.read_hit)[cache.get_state(index, way)]
+            if depends and address in bus.S:
+                rule = shared_rule
+            if rule.state is None:
+                return None
+            cache.set_state(index, way, rule.state)
+            cache.touch(index, way, cycle)
+            if rule.sharing is not None:
+                self.update_sharing(rule.sharing, address)
+            return rule.request
+
+        request, depends, unshared, shared, _, evict_sharing, fill_sharing = \
+            self.write_miss if write else self.read_miss
+        way = cache.empty_way(index)
+        if way == -1:
+            way = cache.lru_way(index)
+            if evict_sharing is not None:
+                self.update_sharing(evict_sharing, address)
+        state = (shared if depends and address in bus.S else unshared)[0]
+        if fill_sharing is not None:
+            self.update_sharing(fill_sharing, address)
+        cache.fill(index, way, tag, state, cycle)
+        return request
+
+    def warm_snoop(self, address, trans_type):
+        # another core's warmed request for a block this cache may hold
+        index, tag = self.convert_address(address)
+        cache = self.cache
+        way = cache.lookup(index, tag)
+        if way != -1:
+            rule = self.snoops[trans_type][cache.get_state(index, way)]
+            if rule.state is not None:
+                cache.set_state(index, way, rule.state)
+            if rule.unshare:
+                self.shared_bus.unset_shared_block(address)
 
-                if block_to_transit.state == MESI.State.S:
-                    self.shared_bus.public_access += 1
 
-            elif trans_type == Transaction.Type.BusRdX:
-                if block_to_transit.state == MESI.State.M or block_to_transit.state == MESI.State.E:
-                    self.shared_bus.private_access += 1
-                    block_to_transit.state = MESI.State.I
-                    self.shared_bus.invalidations += 1
-                    new_transaction = Transaction(self.core_id, Transaction.Type.Flush)
-                    self.shared_bus.add_transaction(new_transaction)
-                    cycles += 100
+class MESI(Protocol):
+    class State(IntEnum):
+        M = 0
+        E = 1
+        S = 2
+        I = 3
 
-                elif block_to_transit.state == MESI.State.S:
-                    self.shared_bus.public_access += 1
-                    block_to_transit.state = MESI.State.I
-                    self.shared_bus.invalidations += 1
-                self.shared_bus.unset_shared_block(address)
-        return cycles
+    READ_HIT = {
+        State.M: Hit(State.M),
+        State.E: Hit(State.E),
+        State.S: Hit(State.S),
+        State.I: Hit(State.I),
+    }
+    WRITE_HIT = {
+        State.M: Hit(State.M),
+        State.E: Hit(State.M),
+        State.S: Hit(State.M, BusRdX, UNSET_SHARED),
+        State.I: Hit(None),
+    }
+    # a read miss only pays for memory when it evicts, a write miss never does
+    READ_MISS = Miss(BusRd, unshared=(State.E, 0), shared=(State.S, 0), evict_cycles=100, fill_sharing=SET_SHARED)
+    WRITE_MISS = Miss(BusRdX, unshared=(State.M, 0), shared=(State.M, 0), evict_sharing=UNSET_SHARED)
+    WRITEBACK = frozenset({State.M})
+    SNOOP = {
+        BusRd: {
+            State.M: Snoop(State.S, flush=True, private=1, public=1),
+            State.E: Snoop(State.S, flush=True, private=1, public=1),
+            State.S: Snoop(public=1),
+        },
+        BusRdX: {
+            State.M: Snoop(State.I, flush=True, private=1, invalidations=1, unshare=True),
+            State.E: Snoop(State.I, flush=True, private=1, invalidations=1, unshare=True),
+            State.S: Snoop(State.I, public=1, invalidations=1, unshare=True),
+            State.I: Snoop(unshare=True),
+        },
+    }
 
 
 class Dragon(Protocol):
-    class State(Enum):
+    class State(IntEnum):
         M = 0
         E = 1
         Sc = 2
         Sm = 3
 
-    def __init__(self, core_id, cache, shared_bus):
-        super().__init__(core_id, cache, shared_bus)
-
-    def PrRd(self, address, cycle):
-
-        index, tag = self.convert_address(address)
-        cache_set = self.cache.blocks[index]
-        execution_cycle = 0
-        hit_id = self.cache_hit(cache_set, tag)
-
-        # determine cache hit, no state transition if hit
-        if hit_id != -1:
-            execution_cycle += 1
-            cache_set[hit_id].last_used_cycle = cycle
-
-        # PrRdMiss, load from main memory
-        else:
-            empty_block = self.get_empty_block(cache_set)
-
-            if empty_block != -1:  # find empty block in cache set
-                # determine whether this cache block is shared on bus
-                if address in self.shared_bus.S:
-                    # data is retrieved from another cache
-                    state = Dragon.State.Sc
-                    execution_cycle += 2 * self.cache.block_size // 4
-                else:
-                    # data is retrieved from the main memory
-                    state = Dragon.State.E
-                    execution_cycle += 100
-
-                self.shared_bus.set_shared_block(address)
-                cache_set[empty_block] = CacheBlock(tag, state, cycle)
-                # execution_cycle += 2
-
-            else:  # no empty block, cache set full, evict a block
-                min_lru_index = self.lru_block_index(cache_set)
-
-                if cache_set[min_lru_index].state == Dragon.State.M or cache_set[
-                    min_lru_index].state == Dragon.State.Sm:
-                    # Write dirty block back to memory
-                    new_transaction = Transaction(self.core_id, Transaction.Type.Flush)
-                    self.shared_bus.add_transaction(new_transaction)
-                    execution_cycle += 100
-
-                if cache_set[min_lru_index].state == Dragon.State.Sm:
-                    # Notify other caches that hold the same data to change state
-                    new_transaction = Transaction(self.core_id, Transaction.Type.BusUpd, address)
-                    self.shared_bus.add_transaction(new_transaction)
-
-                # load from main memory or other cache
-                if address in self.shared_bus.S:
-                    # data is retrieved from another cache
-                    state = Dragon.State.Sc
-                    execution_cycle += 2 * self.cache.block_size // 4
-                else:
-                    # data is retrieved from the main memory
-                    state = Dragon.State.E
-                    execution_cycle += 100
-
-                self.shared_bus.set_shared_block(address)
-                cache_set[min_lru_index] = CacheBlock(tag, state, cycle)
-
-            new_transaction = Transaction(self.core_id, Transaction.Type.BusRd, address)
-            self.shared_bus.add_transaction(new_transaction)
-        return execution_cycle
-
-    def PrWr(self, address, cycle):
-
-        index, tag = self.convert_address(address)
-        cache_set = self.cache.blocks[index]
-        execution_cycle = 0
-        hit_id = self.cache_hit(cache_set, tag)
-
-        # determine cache hit, if hit
-        if hit_id != -1:
-            execution_cycle += 1
-            if cache_set[hit_id].state == Dragon.State.M:
-                cache_set[hit_id] = CacheBlock(tag, Dragon.State.M, cycle)
-            elif cache_set[hit_id].state == Dragon.State.Sm and address not in self.shared_bus.S:
-                cache_set[hit_id] = CacheBlock(tag, Dragon.State.M, cycle)
-            elif cache_set[hit_id].state == Dragon.State.Sm and address in self.shared_bus.S:
-                cache_set[hit_id] = CacheBlock(tag, Dragon.State.Sm, cycle)
-                # tell other caches that they should update their state for this particular cache line
-                new_transaction = Transaction(self.core_id, Transaction.Type.BusUpd, address)
-                self.shared_bus.add_transaction(new_transaction)
-            elif cache_set[hit_id].state == Dragon.State.E:
-                cache_set[hit_id] = CacheBlock(tag, Dragon.State.M, cycle)
-            elif cache_set[hit_id].state == Dragon.State.Sc and address not in self.shared_bus.S:
-                cache_set[hit_id] = CacheBlock(tag, Dragon.State.M, cycle)
-            elif cache_set[hit_id].state == Dragon.State.Sc and address in self.shared_bus.S:
-                cache_set[hit_id] = CacheBlock(tag, Dragon.State.Sm, cycle)
-                # tell other caches that they should update their state for this particular cache line
-                new_transaction = Transaction(self.core_id, Transaction.Type.BusUpd, address)
-                self.shared_bus.add_transaction(new_transaction)
-
-        # PrWrMiss, the cache must obtain the data block, place it in the cache, and then write the new data
-        else:
-            empty_block = self.get_empty_block(cache_set)
-
-            if empty_block != -1:  # find empty block in cache set
-                # determine whether this address is shared on bus
-                if address in self.shared_bus.S:
-                    # cache block is shared and this cache set is the owner
-                    cache_set[empty_block] = CacheBlock(tag, Dragon.State.Sm, cycle)
-                else:
-                    # cache block is not shared 
-                    cache_set[empty_block] = CacheBlock(tag, Dragon.State.M, cycle)
-                # execution_cycle += 2
-            else:  # no empty block, cache set full, evict a block
-                min_lru_index = self.lru_block_index(cache_set)
-
-                if cache_set[min_lru_index].state == Dragon.State.M or cache_set[
-                    min_lru_index].state == Dragon.State.Sm:
-                    # Write dirty block back to memory
-                    new_transaction = Transaction(self.core_id, Transaction.Type.Flush)
-                    self.shared_bus.add_transaction(new_transaction)
-                    execution_cycle += 100
-
-                if cache_set[min_lru_index].state == Dragon.State.Sm:
-                    # Notify other caches that hold the same data to change state
-                    new_transaction = Transaction(self.core_id, Transaction.Type.BusUpd, address)
-                    self.shared_bus.add_transaction(new_transaction)
-
-                # load from main memory
-                self.shared_bus.unset_shared_block(address)
-                execution_cycle += 100
-                # determine whether this address is shared on bus
-                if address in self.shared_bus.S:
-                    # cache block is shared and this cache set is the owner
-                    cache_set[min_lru_index] = CacheBlock(tag, Dragon.State.Sm, cycle)
-                else:
-                    # cache block is not shared 
-                    cache_set[min_lru_index] = CacheBlock(tag, Dragon.State.M, cycle)
-
-            new_transaction = Transaction(self.core_id, Transaction.Type.BusRd, address)
-            self.shared_bus.add_transaction(new_transaction)
-        return execution_cycle
-
-    def snoop(self, transaction):
-        if not transaction:
-            return 0
-
-        if not transaction.address:  # Flush request on bus
-            self.shared_bus.traffic_bytes += self.cache.block_size
-            return 0
-
-        cycles = 0
-
-        trans_type = transaction.trans_type
-        address = transaction.address
-
-        index, tag = self.convert_address(address)
-        cache_set = self.cache.blocks[index]
-
-        block_to_transit = None
-        if transaction.core_id != self.core_id:
-            # Implement logic for transactions issued by other processors
-            for block in cache_set:
-                if block.tag == tag:
-                    block_to_transit = block
-
-            if block_to_transit is None:
-                return 0
-
-            self.shared_bus.traffic_bytes += self.cache.block_size
-            if block_to_transit.state == Dragon.State.Sm or block_to_transit.state == Dragon.State.Sc:
-                self.shared_bus.public_access += 1
-            if block_to_transit.state == Dragon.State.M or block_to_transit.state == Dragon.State.E:
-                self.shared_bus.private_access += 1
-
-            if trans_type == Transaction.Type.BusRd:
-                if block_to_transit.state == Dragon.State.M or block_to_transit.state == Dragon.State.Sm:
-                    block_to_transit.state = Dragon.State.Sm
-                    new_transaction = Transaction(self.core_id, Transaction.Type.Flush)
-                    self.shared_bus.add_transaction(new_transaction)
-                    cycles = 100
-
-                if block_to_transit.state == Dragon.State.Sc or block_to_transit.state == Dragon.State.E:
-                    block_to_transit.state = Dragon.State.Sc
-
-            elif trans_type == Transaction.Type.BusUpd:
-                self.shared_bus.updates += 1
-                if block_to_transit.state == Dragon.State.Sm or block_to_transit.state == Dragon.State.Sc:
-                    block_to_transit.state = Dragon.State.Sc
-        return cycles
+    READ_HIT = {
+        State.M: Hit(State.M),
+        State.E: Hit(State.E),
+        State.Sc: Hit(State.Sc),
+        State.Sm: Hit(State.Sm),
+    }
+    WRITE_HIT = {
+        State.M: Hit(State.M),
+        State.E: Hit(State.M),
+        State.Sc: Hit(State.M),
+        State.Sm: Hit(State.M),
+    }
+    # while other caches share the block, a write updates them
+    WRITE_HIT_SHARED = {
+        State.Sc: Hit(State.Sm, BusUpd),
+        State.Sm: Hit(State.Sm, BusUpd),
+    }
+    READ_MISS = Miss(BusRd, unshared=(State.E, 100), shared=(State.Sc, CACHE_TO_CACHE), fill_sharing=SET_SHARED)
+    WRITE_MISS = Miss(BusRd, unshared=(State.M, 0), shared=(State.Sm, 0), evict_cycles=100,
+                      evict_sharing=UNSET_SHARED)
+    WRITEBACK = frozenset({State.M, State.Sm})
+    EVICT_UPDATE = frozenset({State.Sm})
+    SNOOP = {
+        BusRd: {
+            State.M: Snoop(State.Sm, flush=True, private=1),
+            State.E: Snoop(State.Sc, private=1),
+            State.Sc: Snoop(public=1),
+            State.Sm: Snoop(flush=True, public=1),
+        },
+        BusRdX: {
+            State.M: Snoop(private=1),
+            State.E: Snoop(private=1),
+            State.Sc: Snoop(public=1),
+            State.Sm: Snoop(public=1),
+        },
+        BusUpd: {
+            State.M: Snoop(private=1, updates=1),
+            State.E: Snoop(private=1, updates=1),
+            State.Sc: Snoop(public=1, updates=1),
+            State.Sm: Snoop(State.Sc, public=1, updates=1),
+        },
+    }
@@ -0,0 +1,195 @@
+import argparse
+import heapq
+import sys
+
+from cache import address_bits
+from sweep import parse_values, write_table
+from traces import discover_traces, load_trace
+
+# One-pass miss-ratio curves from LRU stack distances. A reference hits in an
+# A-way set-associative cache exactly when fewer than A distinct blocks of its
+# set were used since its block was last used, so one pass per set count gives
+# the misses of every associativity (and so every cache size) with that many sets.
+
+
+def memory_references(records, offset_bits):
+    # block addresses and issue times of one core's loads and stores; time
+    # counts one cycle per reference plus compute cycles, ignoring stalls
+    blocks = []
+    writes = []
+    times = []
+    time = 0
+    for label, value in records:
+        if label == 2:
+            time += value
+            continue
+        blocks.append(value >> offset_bits)
+        writes.append(label == 1)
+        times.append(time)
+        time += 1
+    return blocks, writes, times
+
+
+def remote_writes(references):
+    # Marks references whose block another core wrote since this core last
+    # used it, with cores interleaved by issue time, which approximates the
+    # order the full simulation would produce. Under MESI that write
+    # invalidated this core's copy, but the simulator keeps invalidated lines
+    # resident and counts using them as hits, so within the LRU reach these
+    # are remote-write reuses rather than misses it reports; they are the
+    # misses a cache that drops invalidated lines would add. A write to an
+    # invalidated line does not refresh its recency in the simulator either,
+    # so its MESI miss counts can differ slightly from the LRU ones here.
+    flags = [[False] * len(blocks) for blocks, _, _ in references]
+    streams = [zip(times, range(len(times)), [core_id] * len(times))
+               for core_id, (_, _, times) in enumerate(references)]
+    last_write = {}  # block -> (sequence, core id) of its latest write
+    seen = [{} for _ in references]  # per core: block -> sequence of its latest use
+    for sequence, (_, i, core_id) in enumerate(heapq.merge(*streams)):
+        blocks, writes, _ = references[core_id]
+        block = blocks[i]
+        write = last_write.get(block)
+        if write is not None and write[1] != core_id and write[0] > seen[core_id].get(block, -1):
+            flags[core_id][i] = True
+        seen[core_id][block] = sequence
+        if writes[i]:
+            last_write[block] = (sequence, core_id)
+    return flags
+
+
+def stack_histogram(blocks, remote_written, index_bits, max_ways):
+    # hist[d] counts references at stack distance d < max_ways in their set,
+    # with first touches and longer distances in hist[max_ways]; reused[d]
+    # counts the references among hist[d] flagged by remote_writes()
+    mask = (1 << index_bits) - 1
+    sets = [block & mask for block in blocks]
+    # Fenwick tree over access slots, each set owning a contiguous range of
+    # slots in time order; a slot holds 1 while it is its block's latest use
+    position = [0] * (mask + 1)
+    for index in sets:
+        position[index] += 1
+    start = 0
+    for index, count in enumerate(position):
+        position[index] = start
+        start += count
+    size = len(blocks)
+    tree = [0] * (size + 1)
+    last = {}
+    hist = [0] * (max_ways + 1)
+    reused = [0] * (max_ways + 1)
+    for block, index, flag in zip(blocks, sets, remote_written):
+        position[index] += 1
+        slot = position[index]
+        previous = last.get(block)
+        distance = max_ways
+        if previous is not None:
+            # blocks used in this set strictly after the previous use
+            count = 0
+            i = slot - 1
+            while i > 0:
+                count += tree[i]
+                i &= i - 1
+            i = previous
+            while i > 0:
+                count -= tree[i]
+                i &= i - 1
+            if count < max_ways:
+                distance = count
+            i = previous
+            while i <= size:
+                tree[i] -= 1
+                i += i & -i
+        i = slot
+        while i <= size:
+            tree[i] += 1
+            i += i & -i
+        last[block] = slot
+        hist[distance] += 1
+        if flag:
+            reused[distance] += 1
+    return hist, reused
+
+
+def analyze(traces, protocol, cache_sizes, associativities, block_sizes):
+    rows = []
+    for block_size in block_sizes:
+        offset_bits = address_bits(block_size, 1, block_size)[0]
+        references = [memory_references(trace, offset_bits) for trace in traces]
+        if protocol == "MESI":
+            flags = remote_writes(references)
+        else:
+            # Dragon updates shared copies instead of invalidating them
+            flags = [[False] * len(blocks) for blocks, _, _ in references]
+
+        # every geometry with the same number of sets shares one pass
+        geometries = {}
+        for cache_size in cache_sizes:
+            for associativity in associativities:
+                if cache_size < associativity * block_size:
+                    continue
+                index_bits = address_bits(cache_size, associativity, block_size)[1]
+                geometries.setdefault(index_bits, []).append((cache_size, associativity))
+
+        for index_bits, group in sorted(geometries.items()):
+            max_ways = max(associativity for _, associativity in group)
+            histograms = [
+                stack_histogram(blocks, core_flags, index_bits, max_ways)
+                for (blocks, _, _), core_flags in zip(references, flags)
+            ]
+            for cache_size, associativity in sorted(group):
+                row = {
+                    'protocol': protocol,
+                    'cache_size': cache_size,
+                    'associativity': associativity,
+                    'block_size': block_size,
+                }
+                total_references = total_misses = total_reuses = 0
+                for core_id, (hist, reused) in enumerate(histograms):
+                    accesses = sum(hist)
+                    misses = accesses - sum(hist[:associativity])
+                    reuses = sum(reused[:associativity])
+                    row[f"core{core_id}_misses"] = misses
+                    row[f"core{core_id}_remote_write_reuses"] = reuses
+                    total_references += accesses
+                    total_misses += misses
+                    total_reuses += reuses
+                row['references'] = total_references
+                row['misses'] = total_misses
+                row['remote_write_reuses'] = total_reuses
+                # miss_rate_with_invalidations also counts every remote-write reuse as a miss
+                row['miss_rate'] = total_misses / total_references * 100 if total_references else 0.0
+                row['miss_rate_with_invalidations'] = (
+                    (total_misses + total_reuses) / total_references * 100 if total_references else 0.0)
+                rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Miss-ratio curves from one stack-distance pass per set count")
+    parser.add_argument("input_file", help="Input benchmark name, trace directory or glob")
+    parser.add_argument("--protocol", choices=["MESI", "Dragon"], default="MESI",
+                        help="Protocol whose invalidations are counted as remote-write reuses (MESI only)")
+    parser.add_argument("--cache-size", default="1024:65536", help="Cache sizes in bytes, e.g. 1024,4096 or 1024:65536")
+    parser.add_argument("--associativity", default="1:16", help="Associativities, e.g. 1,2,4 or 1:16")
+    parser.add_argument("--block-size", default="32", help="Block sizes in bytes, e.g. 16,32 or 16:128")
+    parser.add_argument("--cores", type=int, default=None, help="Number of cores (default: one per discovered trace file)")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv", help="Output table format")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+    try:
+        cache_sizes, associativities, block_sizes = (
+            parse_values(text) for text in (args.cache_size, args.associativity, args.block_size))
+    except ValueError as error:
+        parser.error(str(error))
+
+    traces = [load_trace(path) for path in discover_traces(args.input_file, args.cores)]
+    rows = analyze(traces, args.protocol, cache_sizes, associativities, block_sizes)
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            write_table(rows, out, args.format)
+    else:
+        write_table(rows, sys.stdout, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import math
+import statistics
+
+import coherence
+from bus import Bus
+from core import Core
+
+# SMARTS-style sampling: every period records per core, a detailed window of
+# window records is simulated with full timing and bus accounting. Up to warmup
+# records before each window are functionally warmed (cache contents only) and
+# the rest of the period is skipped. Compute cycles and instruction counts are
+# exact; memory stall cycles, misses and bus activity are extrapolated from
+# per-window rates per memory reference, with normal confidence intervals.
+
+
+def warm(cores, shared_bus, count):
+    # cores take turns, one record each, so shared blocks see a plausible interleaving
+    offset_bits = shared_bus.offset_bits
+    for _ in range(count):
+        for core in cores:
+            if core.is_empty():
+                continue
+            label, value = core.advance()
+            if label == 2:
+                continue
+            request = core.protocol.warm(value, label == 1, core.cycles)
+            if request is None:
+                continue
+            others = shared_bus.sharers.get(value >> offset_bits, 0) & ~(1 << core.core_id)
+            while others:
+                low = others & -others
+                cores[low.bit_length() - 1].protocol.warm_snoop(value, request)
+                others ^= low
+
+
+def detailed(cores, shared_bus, count):
+    # Runs the next count records of every core through coherence.run, all
+    # cores starting at the same cycle. Returns per core (memory references,
+    # stall cycles, hits, misses) of the window.
+    start = max(core.cycles for core in cores)
+    before = []
+    limits = []
+    for core in cores:
+        core.cycles = core.next_issue = start
+        before.append((core.loads + core.stores, core.compute_cycles, core.cache.hit, core.cache.miss))
+        limits.append(core.position + count)
+
+    coherence.run(cores, shared_bus, stop=lambda core: core.position >= limits[core.core_id])
+
+    return [
+        (core.loads + core.stores - references, core.cycles - start - (core.compute_cycles - compute),
+         core.cache.hit - hits, core.cache.miss - misses)
+        for core, (references, compute, hits, misses) in zip(cores, before)
+    ]
+
+
+def estimate(samples, total, z):
+    # samples are per-window rates, total is what they are scaled up to
+    mean = statistics.fmean(samples) if samples else 0.0
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    return mean * total, z * stdev / math.sqrt(len(samples)) * total if samples else 0.0
+
+
+class SampledResult:
+    def __init__(self, config, sampling, cores, overall_cycles, miss_rate, bus, error_target):
+        self.config = config
+        self.sampling = sampling
+        self.cores = cores  # per core {'core_id', 'compute_cycles', 'references', 'cycles', 'cycles_error'}
+        self.overall_cycles = overall_cycles  # (estimate, half-width)
+        self.miss_rate = miss_rate  # (estimate, half-width), percent
+        self.bus = bus  # name -> (estimate, half-width)
+        self.error_target = error_target
+
+    def relative_error(self):
+        estimate, error = self.overall_cycles
+        return error / estimate if estimate else 0.0
+
+    def windows_needed(self):
+        # the interval shrinks with the square root of the number of windows
+        windows = self.sampling['windows']
+        return math.ceil(windows * (self.relative_error() / self.error_target) ** 2) if self.error_target else windows
+
+    def suggestion(self):
+        # the same trace split into windows_needed() periods; once a period
+        # would no longer fit the window, the window has to shrink instead
+        sampling = self.sampling
+        period = sampling['period'] * sampling['windows'] // max(self.windows_needed(), 1)
+        if period > sampling['window']:
+            return f"i.e. a period of at most {period} records"
+        if period >= 2:
+            return f"e.g. --sample-period {period} --sample-window {period // 2}"
+        return "more windows than the trace has records; run it in full instead"
+
+    def as_dict(self):
+        return {
+            'config': dict(self.config),
+            'sampling': dict(self.sampling, relative_error=self.relative_error(),
+                             error_target=self.error_target, windows_needed=self.windows_needed()),
+            'overall_cycles': self.overall_cycles[0],
+            'overall_cycles_error': self.overall_cycles[1],
+            'cores': [dict(stats) for stats in self.cores],
+            'miss_rate': self.miss_rate[0],
+            'miss_rate_error': self.miss_rate[1],
+            'bus': {key: value for name, (estimate, error) in self.bus.items()
+                    for key, value in ((name, estimate), (f"{name}_error", error))},
+        }
+
+    def as_row(self):
+        row = dict(self.config)
+        row.update(self.sampling)
+        row['overall_cycles'], row['overall_cycles_error'] = self.overall_cycles
+        for stats in self.cores:
+            row[f"core{stats['core_id']}_cycles"] = stats['cycles']
+            row[f"core{stats['core_id']}_cycles_error"] = stats['cycles_error']
+        row['miss_rate'], row['miss_rate_error'] = self.miss_rate
+        for name, (value, error) in self.bus.items():
+            row[name], row[f"{name}_error"] = value, error
+        return row
+
+    def output(self):
+        sampling = self.sampling
+        print('===== SAMPLED ESTIMATE =====')
+        print(f"{sampling['windows']} windows of {sampling['window']} records every {sampling['period']} "
+              f"records, {sampling['warmup']} warmed, {sampling['confidence'] * 100:g}% confidence")
+        for stats in self.cores:
+            print(f"Core {stats['core_id']} Execution Cycles: {stats['cycles']:.0f} +/- {stats['cycles_error']:.0f}")
+        estimate, error = self.overall_cycles
+        print(f"Overall execution cycles: {estimate:.0f} +/- {error:.0f} ({self.relative_error() * 100:.2f}%)")
+        print(f"Cache Miss Rate: {self.miss_rate[0]:.4f} +/- {self.miss_rate[1]:.4f} %")
+        for name, (value, error) in self.bus.items():
+            print(f"{name}: {value:.0f} +/- {error:.0f}")
+        if self.relative_error() > self.error_target:
+            print(f"Error target of {self.error_target * 100:g}% not met: about {self.windows_needed()} windows "
+                  f"are needed, {self.suggestion()}")
+        print('\n')
+
+
+def simulate_sampled(protocol, traces, cache_size, associativity, block_size, period, window,
+                     warmup=None, confidence=0.95, error_target=0.05, profiler=None):
+    # Functional warming costs about as much per record as a detailed cache hit
+    # here, so by default only twice the window is warmed rather than the whole gap
+    if warmup is None:
+        warmup = 2 * window
+    warmup = min(warmup, period - window)
+    shared_bus = Bus()
+    cores = [
+        Core(i, cache_size, associativity, block_size, protocol, trace_data, shared_bus)
+        for i, trace_data in enumerate(traces)
+    ]
+    if profiler is not None:
+        # only the detailed windows go through the timed protocol entry points
+        profiler.instrument(cores, shared_bus)
+    bus_fields = ('traffic_bytes', 'invalidations', 'updates')
+
+    windows = []  # per window: per-core samples and bus deltas
+    while not all(core.is_empty() for core in cores):
+        for core in cores:
+            core.skip(period - window - warmup)
+        warm(cores, shared_bus, warmup)
+        if all(core.is_empty() for core in cores):
+            break
+        bus_before = [getattr(shared_bus, field) for field in bus_fields]
+        per_core = detailed(cores, shared_bus, window)
+        bus_delta = [getattr(shared_bus, field) - before for field, before in zip(bus_fields, bus_before)]
+        windows.append((per_core, bus_delta))
+
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    core_stats = []
+    for core in cores:
+        references = core.loads + core.stores
+        stall_rates = [per_core[core.core_id][1] / per_core[core.core_id][0]
+                       for per_core, _ in windows if per_core[core.core_id][0]]
+        stalls, error = estimate(stall_rates, references, z)
+        core_stats.append({
+            'core_id': core.core_id,
+            'compute_cycles': core.compute_cycles,
+            'references': references,
+            'cycles': core.compute_cycles + stalls,
+            'cycles_error': error,
+        })
+    slowest = max(core_stats, key=lambda stats: stats['cycles'], default=None)
+    overall_cycles = (slowest['cycles'], slowest['cycles_error']) if slowest else (0.0, 0.0)
+
+    miss_rates = []
+    bus_rates = [[] for _ in bus_fields]
+    for per_core, bus_delta in windows:
+        references = sum(sample[0] for sample in per_core)
+        accesses = sum(sample[2] + sample[3] for sample in per_core)
+        if accesses:
+            miss_rates.append(sum(sample[3] for sample in per_core) / accesses * 100)
+        if references:
+            for rates, delta in zip(bus_rates, bus_delta):
+                rates.append(delta / references)
+    miss_rate = estimate(miss_rates, 1, z)
+    total_references = sum(stats['references'] for stats in core_stats)
+    bus = {field: estimate(rates, total_references, z) for field, rates in zip(bus_fields, bus_rates)}
+
+    config = {
+        'protocol': protocol,
+        'cache_size': cache_size,
+        'associativity': associativity,
+        'block_size': block_size,
+    }
+    sampling = {
+        'period': period,
+        'window': window,
+        'warmup': warmup,
+        'windows': len(windows),
+        'confidence': confidence,
+    }
+    return SampledResult(config, sampling, core_stats, overall_cycles, miss_rate, bus, error_target)
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import memo
+from coherence import simulate
+from traces import RECORD, discover_traces, load_trace, trace_digest
+
+# Jobs are newline-delimited JSON objects sent over a Unix socket, e.g.
+#   {"protocol": "MESI", "input": "bodytrack", "cache_size": 4096, "associativity": 2, "block_size": 32}
+# and each is answered with one JSON line: {"ok": true, "cached": false, "result": {...}}
+# what a result depends on besides the traces, as in the CLI's result cache
+CONFIG_FIELDS = ('protocol', 'cache_size', 'associativity', 'block_size')
+
+
+class TraceCache:
+    # LRU of loaded traces bounded by their size, whether read into memory or
+    # mapped; trim() runs between jobs so a job never loses a trace it uses
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.traces = OrderedDict()  # (path, size, mtime) -> trace
+        self.used_bytes = 0
+
+    def get(self, path):
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key in self.traces:
+            self.traces.move_to_end(key)
+            return self.traces[key]
+        # an edited file leaves its earlier version behind
+        for stale in [other for other in self.traces if other[0] == path]:
+            self.drop(stale)
+        trace = load_trace(path)
+        self.traces[key] = trace
+        self.used_bytes += trace.count * RECORD.size
+        return trace
+
+    def drop(self, key):
+        trace = self.traces.pop(key)
+        self.used_bytes -= trace.count * RECORD.size
+        try:
+            trace.close()
+        except BufferError:
+            pass  # still read by a failed job's traceback, unmapped once that is freed
+
+    def trim(self):
+        while self.used_bytes > self.budget_bytes and self.traces:
+            self.drop(next(iter(self.traces)))
+
+
+_trace_cache = None
+
+
+def _init_worker(budget_bytes):
+    global _trace_cache
+    _trace_cache = TraceCache(budget_bytes)
+
+
+def run_job(job, paths):
+    try:
+        traces = [_trace_cache.get(path) for path in paths]
+        result = simulate(job['protocol'], traces, job['cache_size'], job['associativity'], job['block_size'])
+        return result.as_dict()
+    finally:
+        _trace_cache.trim()
+
+
+def job_key(job, digests):
+    # the key memo.trace_key gives the same run from the command line, so it
+    # covers the simulator sources as well as the traces' contents
+    return memo.result_key(digests, {field: job[field] for field in CONFIG_FIELDS})
+
+
+class ResultStore:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, job TEXT, result TEXT)")
+        self.db.commit()
+
+    def get(self, key):
+        row = self.db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, job, result):
+        self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, json.dumps(job), json.dumps(result)))
+        self.db.commit()
+
+
+class Runner:
+    def __init__(self, store, workers, trace_budget_bytes):
+        self.store = store
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(trace_budget_bytes,))
+        self.pending = {}  # key -> task, so identical jobs in flight run once
+        self.digests = {}  # path -> (size, mtime, trace_digest), so unchanged traces are hashed once
+
+    async def submit(self, job):
+        for field in ('protocol', 'input', 'cache_size', 'associativity', 'block_size'):
+            if field not in job:
+                raise ValueError(f"missing job field: {field}")
+        if job['protocol'] not in ("MESI", "Dragon"):
+            raise ValueError(f"unknown protocol: {job['protocol']}")
+        paths = discover_traces(job['input'], job.get('cores'))
+        key = job_key(job, [await self.digest(path) for path in paths])
+        result = self.store.get(key)
+        if result is not None:
+            return result, True
+        if key not in self.pending:
+            self.pending[key] = asyncio.ensure_future(self.run(key, job, paths))
+        # shielded, so a client going away does not cancel the run for the others
+        return await asyncio.shield(self.pending[key]), False
+
+    async def digest(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        size, mtime, digest = self.digests.get(path, (None, None, None))
+        if (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+            digest = await asyncio.get_running_loop().run_in_executor(None, trace_digest, path)
+            self.digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    async def run(self, key, job, paths):
+        # the one task running a job stores its result, however many wait on it
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.pool, run_job, job, paths)
+            self.store.put(key, job, result)
+            return result
+        finally:
+            del self.pending[key]
+
+    async def handle(self, reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                result, cached = await self.submit(json.loads(line))
+                reply = {'ok': True, 'cached': cached, 'result': result}
+            except Exception as error:
+                reply = {'ok': False, 'error': f"{type(error).__name__}: {error}"}
+            writer.write(json.dumps(reply).encode() + b'\n')
+            await writer.drain()
+        writer.close()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+async def serve(socket_path, store_path, workers, trace_budget_bytes):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    runner = Runner(ResultStore(store_path), workers, trace_budget_bytes)
+    server = await asyncio.start_unix_server(runner.handle, path=socket_path)
+    print(f"Listening on {socket_path}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        runner.close()
+
+
+async def submit(socket_path, job):
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(json.dumps(job).encode() + b'\n')
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return reply
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived simulation job runner")
+    parser.add_argument("--socket", default="coherence.sock", help="Unix socket path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the job server")
+    serve_parser.add_argument("--db", default="results.sqlite", help="SQLite result store")
+    serve_parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    serve_parser.add_argument("--trace-cache-mb", type=int, default=512,
+                              help="Per-worker budget for cached traces in MB")
+
+    submit_parser = commands.add_parser("submit", help="Submit one job and print its result")
+    submit_parser.add_argument("protocol", choices=["MESI", "Dragon"], help="Coherence protocol")
+    submit_parser.add_argument("input_file", help="Input benchmark name, trace directory or glob")
+    submit_parser.add_argument("cache_size", type=int, help="Cache size in bytes")
+    submit_parser.add_argument("associativity", type=int, help="Cache associativity")
+    submit_parser.add_argument("block_size", type=int, help="Block size in bytes")
+    submit_parser.add_argument("--cores", type=int, default=None, help="Number of cores")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.socket, args.db, args.workers, args.trace_cache_mb << 20))
+        except KeyboardInterrupt:
+            pass
+    else:
+        job = {
+            'protocol': args.protocol,
+            'input': os.path.abspath(args.input_file) if os.path.exists(args.input_file) else args.input_file,
+            'cache_size': args.cache_size,
+            'associativity': args.associativity,
+            'block_size': args.block_size,
+            'cores': args.cores,
+        }
+        reply = asyncio.run(submit(args.socket, job))
+        json.dump(reply, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        if not reply['ok']:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
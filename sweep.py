@@ -0,0 +1,164 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import memo
+from cache import address_bits
+from coherence import SimulationResult, simulate
+from core import DecodedCore
+from preprocess import load_preprocessed
+from traces import convert_trace, discover_traces, is_binary_trace, load_trace, trace_digest
+
+# Traces loaded once per worker process by _init_worker
+_paths = None
+_traces = None
+_preprocess = False
+_decoded = {}  # (offset bits, index bits) -> pre-decoded traces
+
+
+def parse_values(text):
+    # "a,b,c" is an explicit list, "lo:hi" is every power of two from lo to hi
+    values = []
+    for part in text.split(','):
+        if ':' in part:
+            lo, hi = (int(v) for v in part.split(':'))
+            if lo <= 0:
+                raise ValueError(f"range {part} must start at a positive value")
+            value = lo
+            while value <= hi:
+                values.append(value)
+                value *= 2
+        else:
+            values.append(int(part))
+    return values
+
+
+def prepare_traces(paths, workdir):
+    # Text traces are converted once so every worker can mmap the same pages
+    prepared = []
+    for i, path in enumerate(paths):
+        if not is_binary_trace(path):
+            binary = os.path.join(workdir, f"core_{i}.bin")
+            convert_trace(path, binary)
+            path = binary
+        prepared.append(path)
+    return prepared
+
+
+def _init_worker(paths, preprocess):
+    global _paths, _traces, _preprocess
+    _paths = paths
+    _traces = [load_trace(path) for path in paths]
+    _preprocess = preprocess
+
+
+def run_config(config):
+    if not _preprocess:
+        return simulate(traces=_traces, **config).as_dict()
+    # every protocol at the same geometry shares one decoded copy of the traces
+    bits = address_bits(config['cache_size'], config['associativity'], config['block_size'])
+    if bits not in _decoded:
+        _decoded[bits] = [load_preprocessed(path, *bits) for path in _paths]
+    return simulate(traces=_decoded[bits], core_class=DecodedCore, **config).as_dict()
+
+
+def sweep(input_file, protocols, cache_sizes, associativities, block_sizes, jobs=None, num_cores=None, preprocess=False,
+          result_cache=None):
+    configs = []
+    for protocol, cache_size, associativity, block_size in itertools.product(
+            protocols, cache_sizes, associativities, block_sizes):
+        if cache_size < associativity * block_size:
+            print(f"Skipping cache_size={cache_size} associativity={associativity} "
+                  f"block_size={block_size}: fewer than one set", file=sys.stderr)
+            continue
+        configs.append({
+            'protocol': protocol,
+            'cache_size': cache_size,
+            'associativity': associativity,
+            'block_size': block_size,
+        })
+
+    paths = discover_traces(input_file, num_cores)
+    results = [None] * len(configs)
+    keys = [None] * len(configs)
+    if result_cache is not None:
+        digests = [trace_digest(path) for path in paths]
+        for i, config in enumerate(configs):
+            keys[i] = memo.result_key(digests, config)
+            results[i] = result_cache.get(keys[i])
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if missing:
+        with tempfile.TemporaryDirectory() as workdir:
+            paths = prepare_traces(paths, workdir)
+            # one task per configuration; every worker maps the traces once
+            # and each of its runs reads them straight from the mapping
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(paths, preprocess)) as pool:
+                for i, result in zip(missing, pool.map(run_config, [configs[i] for i in missing])):
+                    results[i] = result
+                    if result_cache is not None:
+                        result_cache.put(keys[i], result)
+    return [SimulationResult.from_dict(result).as_row() for result in results]
+
+
+def write_table(rows, out, fmt):
+    if fmt == 'json':
+        json.dump(rows, out, indent=2)
+        out.write('\n')
+    elif rows:
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="coherence.py sweep", description="Run a grid of cache configurations in parallel"
+    )
+    parser.add_argument("input_file", help="Input benchmark name, trace directory or glob")
+    parser.add_argument(
+        "--protocol", nargs='+', choices=["MESI", "Dragon"], default=["MESI", "Dragon"], help="Coherence protocols"
+    )
+    parser.add_argument("--cache-size", default="4096", help="Cache sizes in bytes, e.g. 1024,4096 or 1024:65536")
+    parser.add_argument("--associativity", default="2", help="Associativities, e.g. 1,2,4 or 1:16")
+    parser.add_argument("--block-size", default="32", help="Block sizes in bytes, e.g. 16,32 or 16:128")
+    parser.add_argument("--cores", type=int, default=None, help="Number of cores (default: one per discovered trace file)")
+    parser.add_argument("--preprocess", action="store_true",
+                        help="Run on traces pre-decoded per geometry, cached on disk across sweeps")
+    parser.add_argument("--no-result-cache", action="store_true",
+                        help="Always simulate, ignoring results cached from earlier runs")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv", help="Output table format")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+    try:
+        cache_sizes, associativities, block_sizes = (
+            parse_values(text) for text in (args.cache_size, args.associativity, args.block_size))
+    except ValueError as error:
+        parser.error(str(error))
+
+    results = sweep(
+        args.input_file,
+        args.protocol,
+        cache_sizes,
+        associativities,
+        block_sizes,
+        args.jobs,
+        args.cores,
+        args.preprocess,
+        None if args.no_result_cache else memo.ResultCache(),
+    )
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            write_table(results, out, args.format)
+    else:
+        write_table(results, sys.stdout, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+import unittest
+
+import checkpoint
+from coherence import simulate
+from test_coherence import BenchmarkTraces
+
+
+class CheckpointTest(BenchmarkTraces):
+    def test_resume_matches_full_run(self):
+        path = os.path.join(self.workdir.name, 'run.ckpt')
+        for protocol in ("MESI", "Dragon"):
+            with self.subTest(protocol=protocol):
+                full = simulate(protocol, self.traces('migratory'), 1024, 1, 16)
+                checkpointer = checkpoint.Checkpointer(path, {}, every_cycles=full.overall_cycles // 3)
+                simulate(protocol, self.traces('migratory'), 1024, 1, 16, checkpointer=checkpointer)
+                state = checkpoint.load(path)
+                self.assertTrue(0 < state['global_cycle'] < full.overall_cycles)
+                traces = [checkpoint.seek(trace, core['position'])
+                          for trace, core in zip(self.traces('migratory'), state['cores'])]
+                resumed = simulate(protocol, traces, 1024, 1, 16, resume_state=state)
+                self.assertEqual(resumed.as_dict(), full.as_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
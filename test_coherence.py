@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import benchmark
+from coherence import simulate
+from traces import discover_traces, load_trace
+
+CONFIGS = [(4096, 2, 32), (1024, 1, 16)]
+
+# Reports of the original simulator on benchmark.generate(pattern, ..., 4, 2000, 0),
+# which every change to the engine must reproduce: (overall cycles, per-core
+# cycles, misses, traffic bytes, invalidations, updates, private accesses,
+# public accesses)
+GOLDEN = {
+    ('false_sharing', 'MESI', (4096, 2, 32)): (10053, [9762, 10053, 9475, 9788], 64, 10976, 48, 0, 56, 50),
+    ('false_sharing', 'MESI', (1024, 1, 16)): (10053, [9762, 10053, 9475, 9788], 64, 5488, 48, 0, 56, 50),
+    ('false_sharing', 'Dragon', (4096, 2, 32)): (10862, [10862, 10853, 10675, 10788], 64, 158528, 0, 4598, 3131, 1563),
+    ('false_sharing', 'Dragon', (1024, 1, 16)): (10862, [10862, 10853, 10675, 10788], 64, 79264, 0, 4598, 3131, 1563),
+    ('migratory', 'MESI', (4096, 2, 32)): (13463, [11703, 12128, 11104, 13463], 256, 47936, 192, 0, 210, 421),
+    ('migratory', 'MESI', (1024, 1, 16)): (159703, [155908, 159703, 153910, 153883], 3050, 249440, 1094, 0, 1319, 2609),
+    ('migratory', 'Dragon', (4096, 2, 32)): (14363, [14023, 13796, 13588, 14363], 256, 395936, 0, 11233, 64, 11553),
+    ('migratory', 'Dragon', (1024, 1, 16)): (72628, [72628, 71079, 69346, 69139], 3050, 251664, 0, 4387, 47, 6590),
+    ('private_streaming', 'MESI', (4096, 2, 32)): (36773, [36773, 36537, 36645, 36007], 1000, 62464, 0, 0, 0, 0),
+    ('private_streaming', 'MESI', (1024, 1, 16)): (99323, [99323, 99087, 99195, 98557], 2000, 111616, 0, 0, 0, 0),
+    ('private_streaming', 'Dragon', (4096, 2, 32)): (49573, [49573, 49337, 49445, 48807], 1000, 62464, 0, 0, 0, 0),
+    ('private_streaming', 'Dragon', (1024, 1, 16)): (105723, [105723, 105487, 105595, 104957], 2000, 111616, 0, 0, 0, 0),
+    ('producer_consumer', 'MESI', (4096, 2, 32)): (34302, [34302, 34196, 33933, 33906], 1000, 126272, 688, 0, 449, 1356),
+    ('producer_consumer', 'MESI', (1024, 1, 16)): (72583, [66252, 72546, 72583, 72556], 2000, 116288, 453, 0, 871, 2673),
+    ('producer_consumer', 'Dragon', (4096, 2, 32)): (41402, [41402, 22168, 22153, 22214], 1000, 71392, 0, 21, 274, 1257),
+    ('producer_consumer', 'Dragon', (1024, 1, 16)): (101052, [101052, 30218, 30271, 30296], 2000, 61104, 0, 12, 512, 1467),
+    ('read_mostly', 'MESI', (4096, 2, 32)): (23111, [19682, 23111, 18599, 21688], 512, 76000, 141, 0, 368, 865),
+    ('read_mostly', 'MESI', (1024, 1, 16)): (170961, [170961, 168522, 167019, 168210], 6080, 107392, 43, 0, 532, 4398),
+    ('read_mostly', 'Dragon', (4096, 2, 32)): (23492, [22602, 22411, 21979, 23492], 512, 28128, 0, 55, 338, 485),
+    ('read_mostly', 'Dragon', (1024, 1, 16)): (51882, [50361, 50182, 48655, 51882], 6080, 80160, 0, 71, 508, 4010),
+}
+
+
+def summary(result):
+    bus = result.bus
+    return (result.overall_cycles, [stats['cycles'] for stats in result.cores],
+            sum(stats['misses'] for stats in result.cores), bus['traffic_bytes'], bus['invalidations'],
+            bus['updates'], bus['private_access'], bus['public_access'])
+
+
+class BenchmarkTraces(unittest.TestCase):
+    # base for tests over 4-core benchmark.generate traces of every pattern
+    @classmethod
+    def setUpClass(cls):
+        cls.workdir = tempfile.TemporaryDirectory()
+        cls.paths = {
+            pattern: discover_traces(benchmark.generate(pattern, os.path.join(cls.workdir.name, pattern), 4, 2000, 0))
+            for pattern in benchmark.PATTERNS
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.workdir.cleanup()
+
+    def traces(self, pattern):
+        return [load_trace(path) for path in self.paths[pattern]]
+
+
+class SimulatorTest(BenchmarkTraces):
+    def test_golden_reports(self):
+        for (pattern, protocol, config), expected in GOLDEN.items():
+            with self.subTest(pattern=pattern, protocol=protocol, config=config):
+                self.assertEqual(summary(simulate(protocol, self.traces(pattern), *config)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import os
+import unittest
+
+import fastpath
+from coherence import simulate
+from core import FastPathCore
+from test_coherence import GOLDEN, BenchmarkTraces, summary
+
+
+class FastPathTest(BenchmarkTraces):
+    def test_fast_path_matches_plain_run(self):
+        cache_dir = os.path.join(self.workdir.name, 'fast')
+        for protocol in ("MESI", "Dragon"):
+            for jobs in (1, 2):
+                with self.subTest(protocol=protocol, jobs=jobs):
+                    traces = fastpath.load(self.paths['private_streaming'], protocol, 4096, 2, 32,
+                                           os.path.join(cache_dir, str(jobs)), jobs)
+                    result = simulate(protocol, traces, 4096, 2, 32, core_class=FastPathCore)
+                    self.assertEqual(summary(result), GOLDEN['private_streaming', protocol, (4096, 2, 32)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import unittest
+
+import checkpoint
+from coherence import simulate
+from intervals import IntervalRecorder
+from test_coherence import BenchmarkTraces
+
+
+class IntervalRecorderTest(BenchmarkTraces):
+    def resume(self, path, cut):
+        # checkpoints a run a third of the way through, cuts its CSV with
+        # cut(data, offset) as if it had stopped there, then resumes it
+        checkpoint_path = os.path.join(self.workdir.name, 'intervals.ckpt')
+        full = simulate("MESI", self.traces('read_mostly'), 1024, 1, 16)
+        intervals = IntervalRecorder(path, every_cycles=20000)
+        checkpointer = checkpoint.Checkpointer(checkpoint_path, {}, every_cycles=full.overall_cycles // 3,
+                                               intervals=intervals)
+        simulate("MESI", self.traces('read_mostly'), 1024, 1, 16, checkpointer=checkpointer, intervals=intervals)
+        state = checkpoint.load(checkpoint_path)
+        with open(path, 'rb') as file:
+            data = file.read()
+        with open(path, 'wb') as file:
+            file.write(cut(data, state['intervals']['offset']))
+        traces = [checkpoint.seek(trace, core['position'])
+                  for trace, core in zip(self.traces('read_mostly'), state['cores'])]
+        simulate("MESI", traces, 1024, 1, 16, resume_state=state, intervals=IntervalRecorder(path, every_cycles=20000))
+        with open(path) as file:
+            return file.read()
+
+    def test_resumed_intervals_match_full_run(self):
+        full_path = os.path.join(self.workdir.name, 'full.csv')
+        simulate("MESI", self.traces('read_mostly'), 1024, 1, 16,
+                 intervals=IntervalRecorder(full_path, every_cycles=20000))
+        with open(full_path) as file:
+            expected = file.read()
+        path = os.path.join(self.workdir.name, 'resumed.csv')
+        cuts = {
+            'whole file': lambda data, offset: data,
+            'at checkpoint': lambda data, offset: data[:offset],
+            'half-written row': lambda data, offset: data[:data.index(b'\n', offset) - 5],
+        }
+        for name, cut in cuts.items():
+            with self.subTest(cut=name):
+                self.assertEqual(self.resume(path, cut), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
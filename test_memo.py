@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+import memo
+
+CONFIG = {'protocol': "MESI", 'cache_size': 4096, 'associativity': 2, 'block_size': 32}
+
+
+class ResultKeyTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, 'trace_0.data')
+        with open(self.path, 'w') as file:
+            file.write("0 0x10\n2 0x5\n")
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_key_covers_traces_config_and_sources(self):
+        key = memo.trace_key([self.path], CONFIG)
+        self.assertEqual(memo.trace_key([self.path], dict(CONFIG)), key)
+        self.assertNotEqual(memo.trace_key([self.path], dict(CONFIG, protocol="Dragon")), key)
+        saved = memo.source_hash()
+        try:
+            memo._source_hash = '0' * 64
+            self.assertNotEqual(memo.trace_key([self.path], CONFIG), key)
+        finally:
+            memo._source_hash = saved
+        with open(self.path, 'a') as file:
+            file.write("1 0x20\n")
+        self.assertNotEqual(memo.trace_key([self.path], CONFIG), key)
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_evicts_least_recently_used(self):
+        result = {'overall_cycles': 1, 'cores': []}
+        cache = memo.ResultCache(self.workdir.name)
+        self.assertIsNone(cache.get('a'))
+        for age, key in enumerate('ab'):
+            cache.put(key, result)
+            os.utime(cache.path(key), ns=(age, age))
+        self.assertEqual(cache.get('a'), result)  # now the most recently used
+        cache.max_bytes = 2 * os.path.getsize(cache.path('a'))
+        cache.put('c', result)
+        self.assertEqual([cache.get(key) for key in 'abc'], [result, None, result])
+
+
+if __name__ == "__main__":
+    unittest.main()
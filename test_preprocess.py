@@ -0,0 +1,26 @@
+import os
+import unittest
+
+from cache import address_bits
+from coherence import simulate
+from core import DecodedCore
+from preprocess import load_preprocessed
+from test_coherence import CONFIGS, BenchmarkTraces
+
+
+class PreprocessTest(BenchmarkTraces):
+    def test_preprocessed_matches_plain_run(self):
+        cache_dir = os.path.join(self.workdir.name, 'decoded')
+        for pattern in ('migratory', 'producer_consumer'):
+            for protocol in ("MESI", "Dragon"):
+                for config in CONFIGS:
+                    with self.subTest(pattern=pattern, protocol=protocol, config=config):
+                        bits = address_bits(*config)
+                        decoded = [load_preprocessed(path, *bits, cache_dir) for path in self.paths[pattern]]
+                        folded = simulate(protocol, decoded, *config, core_class=DecodedCore)
+                        plain = simulate(protocol, self.traces(pattern), *config)
+                        self.assertEqual(folded.as_dict(), plain.as_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import io
+import unittest
+
+from coherence import simulate
+from profiler import Profiler
+from test_coherence import BenchmarkTraces
+
+
+class ProfilerTest(BenchmarkTraces):
+    def test_counts_every_reference_without_changing_the_report(self):
+        for protocol in ("MESI", "Dragon"):
+            with self.subTest(protocol=protocol):
+                profiler = Profiler()
+                result = simulate(protocol, self.traces('producer_consumer'), 4096, 2, 32, profiler)
+                self.assertEqual(result.as_dict(),
+                                 simulate(protocol, self.traces('producer_consumer'), 4096, 2, 32).as_dict())
+                stats = profiler.stats()
+                self.assertEqual(stats['calls']['PrRd'] + stats['calls']['PrWr'],
+                                 sum(core['loads'] + core['stores'] for core in result.cores))
+                self.assertGreater(stats['transactions'], 0)
+                self.assertLessEqual(stats['snoops_per_transaction'], len(result.cores) - 1)
+                out = io.StringIO()
+                profiler.output(out)
+                self.assertTrue(out.getvalue().startswith('===== PROFILE =====\n'))
+
+
+if __name__ == "__main__":
+    unittest.main()
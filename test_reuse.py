@@ -0,0 +1,36 @@
+import unittest
+
+from coherence import simulate
+from reuse import analyze
+from test_coherence import BenchmarkTraces
+
+CACHE_SIZES = [256, 1024, 4096]
+ASSOCIATIVITIES = [1, 2, 4, 8]
+BLOCK_SIZES = [16, 32]
+
+
+class AnalyzeTest(BenchmarkTraces):
+    def test_dragon_misses_match_simulation(self):
+        # Dragon never drops a line but to LRU, so stack distances give its misses exactly
+        for pattern in ('migratory', 'producer_consumer', 'read_mostly'):
+            rows = analyze(self.traces(pattern), "Dragon", CACHE_SIZES, ASSOCIATIVITIES, BLOCK_SIZES)
+            self.assertEqual(len(rows), len(CACHE_SIZES) * len(ASSOCIATIVITIES) * len(BLOCK_SIZES))
+            for row in rows:
+                with self.subTest(pattern=pattern, cache_size=row['cache_size'],
+                                  associativity=row['associativity'], block_size=row['block_size']):
+                    result = simulate("Dragon", self.traces(pattern), row['cache_size'], row['associativity'],
+                                      row['block_size'])
+                    self.assertEqual([row[f"core{core_id}_misses"] for core_id in range(len(result.cores))],
+                                     [stats['misses'] for stats in result.cores])
+                    self.assertEqual(row['remote_write_reuses'], 0)
+                    self.assertEqual(row['miss_rate_with_invalidations'], row['miss_rate'])
+
+    def test_mesi_counts_remote_write_reuses(self):
+        row, = analyze(self.traces('migratory'), "MESI", [4096], [2], [32])
+        self.assertGreater(row['remote_write_reuses'], 0)
+        self.assertEqual(row['miss_rate_with_invalidations'],
+                         (row['misses'] + row['remote_write_reuses']) / row['references'] * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from coherence import simulate
+from sampling import SampledResult, simulate_sampled
+from test_coherence import BenchmarkTraces
+
+SAMPLING = {'period': 100, 'window': 20, 'warmup': 40, 'windows': 10, 'confidence': 0.95}
+
+
+def sampled_result(relative_error):
+    return SampledResult({}, SAMPLING, [], (1000.0, 1000.0 * relative_error), (0.0, 0.0), {}, 0.05)
+
+
+class SampledSimulationTest(BenchmarkTraces):
+    def test_exact_counts_match_full_run(self):
+        for pattern in ('migratory', 'producer_consumer', 'private_streaming'):
+            for protocol in ("MESI", "Dragon"):
+                with self.subTest(pattern=pattern, protocol=protocol):
+                    full = simulate(protocol, self.traces(pattern), 4096, 2, 32)
+                    sampled = simulate_sampled(protocol, self.traces(pattern), 4096, 2, 32, 100, 20)
+                    self.assertEqual([(stats['references'], stats['compute_cycles']) for stats in sampled.cores],
+                                     [(stats['loads'] + stats['stores'], stats['compute_cycles'])
+                                      for stats in full.cores])
+                    self.assertGreater(sampled.sampling['windows'], 1)
+                    estimate, error = sampled.overall_cycles
+                    self.assertGreater(estimate, 0)
+                    self.assertGreaterEqual(error, 0)
+
+    def test_suggestion_shrinks_the_window_once_the_period_would_not_fit(self):
+        self.assertEqual(sampled_result(0.1).windows_needed(), 40)
+        self.assertEqual(sampled_result(0.1).suggestion(), "i.e. a period of at most 25 records")
+        self.assertEqual(sampled_result(0.2).suggestion(), "e.g. --sample-period 6 --sample-window 3")
+        self.assertEqual(sampled_result(10.0).suggestion(),
+                         "more windows than the trace has records; run it in full instead")
+
+
+if __name__ == "__main__":
+    unittest.main()
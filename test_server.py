@@ -0,0 +1,61 @@
+import asyncio
+import os
+import unittest
+
+import memo
+import server
+from coherence import simulate
+from test_coherence import BenchmarkTraces
+from traces import RECORD
+
+
+class CountingStore(server.ResultStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.puts = 0
+
+    def put(self, key, job, result):
+        self.puts += 1
+        super().put(key, job, result)
+
+
+class TraceCacheTest(BenchmarkTraces):
+    def test_trim_closes_least_recently_used(self):
+        paths = self.paths['migratory']
+        cache = server.TraceCache(0)
+        traces = [cache.get(path) for path in paths]
+        self.assertIs(cache.get(paths[0]), traces[0])
+        self.assertEqual(cache.used_bytes, sum(trace.count for trace in traces) * RECORD.size)
+        cache.budget_bytes = cache.used_bytes - 1
+        cache.trim()
+        self.assertEqual(len(cache.traces), len(paths) - 1)
+        self.assertNotIn(paths[1], [key[0] for key in cache.traces])
+        cache.budget_bytes = 0
+        cache.trim()
+        self.assertEqual((len(cache.traces), cache.used_bytes), (0, 0))
+
+
+class RunnerTest(BenchmarkTraces):
+    def test_identical_jobs_run_and_store_once(self):
+        job = {'protocol': "MESI", 'input': os.path.join(self.workdir.name, 'migratory'),
+               'cache_size': 1024, 'associativity': 1, 'block_size': 16}
+        store = CountingStore(os.path.join(self.workdir.name, 'results.sqlite'))
+        runner = server.Runner(store, 1, 1 << 20)
+
+        async def submit_three():
+            first = await asyncio.gather(runner.submit(dict(job)), runner.submit(dict(job)))
+            return first + [await runner.submit(dict(job))]
+        try:
+            replies = asyncio.run(submit_three())
+        finally:
+            runner.close()
+        expected = simulate("MESI", self.traces('migratory'), 1024, 1, 16).as_dict()
+        self.assertEqual(replies, [(expected, False), (expected, False), (expected, True)])
+        self.assertEqual(store.puts, 1)
+        # the same key as the command line's result cache
+        key = memo.trace_key(self.paths['migratory'], {field: job[field] for field in server.CONFIG_FIELDS})
+        self.assertEqual(store.get(key), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
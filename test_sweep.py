@@ -0,0 +1,17 @@
+import unittest
+
+from sweep import parse_values
+
+
+class ParseValuesTest(unittest.TestCase):
+    def test_ranges_and_lists(self):
+        self.assertEqual(parse_values("1:16"), [1, 2, 4, 8, 16])
+        self.assertEqual(parse_values("32,64,128:256"), [32, 64, 128, 256])
+
+    def test_range_from_zero_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_values("0:16")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import time
+import unittest
+
+from traces import convert_trace, discover_traces
+
+
+class DiscoverTracesTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.directory = self.workdir.name
+        for name in ('a_0.data', 'a_1.data'):
+            with open(os.path.join(self.directory, name), 'w') as file:
+                file.write("0 0x10\n2 0x5\n")
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_prefers_fresh_binary(self):
+        convert_trace(self.path('a_0.data'), self.path('a_0.bin'))
+        self.assertEqual(discover_traces(self.directory), [self.path('a_0.bin'), self.path('a_1.data')])
+
+    def test_skips_stale_binary(self):
+        convert_trace(self.path('a_0.data'), self.path('a_0.bin'))
+        past = time.time() - 60
+        os.utime(self.path('a_0.bin'), (past, past))
+        self.assertEqual(discover_traces(self.directory), [self.path('a_0.data'), self.path('a_1.data')])
+
+    def test_rejects_ambiguous_core_ids(self):
+        with open(self.path('b_0.data'), 'w') as file:
+            file.write("0 0x10\n")
+        with self.assertRaises(ValueError):
+            discover_traces(self.directory)
+        self.assertEqual(discover_traces(self.path('b_*')), [self.path('b_0.data')])
+
+
+if __name__ == "__main__":
+    unittest.main()
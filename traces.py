@@ -0,0 +1,201 @@
+import argparse
+import glob
+import gzip
+import hashlib
+import mmap
+import os
+import re
+import struct
+
+# Packed trace format: a fixed header followed by one little-endian
+# (uint8 label, uint32 value) record per trace line.
+MAGIC = b'CCTR'
+VERSION = 1
+HEADER = struct.Struct('<4sIQ')  # magic, version, record count
+RECORD = struct.Struct('<BI')
+
+
+def parse_line(line):
+    label, value = line.split()
+    return int(label), int(value, 16)
+
+
+def pack_record(label, value):
+    if not 0 <= label <= 0xff or not 0 <= value <= 0xffffffff:
+        raise ValueError(f"Trace record out of range: {label} {value:#x}")
+    return RECORD.pack(label, value)
+
+
+class Trace:
+    def __init__(self, buffer, count, source=None):
+        self.buffer = memoryview(buffer)
+        self.count = count
+        self.source = source  # mmap backing the buffer, if any
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self, start=0):
+        # iter_unpack decodes straight from the buffer, no per-line parsing
+        return RECORD.iter_unpack(self.buffer[start * RECORD.size:self.count * RECORD.size])
+
+    def close(self):
+        self.buffer.release()
+        if self.source is not None:
+            self.source.close()
+
+
+def open_text(path):
+    # Text traces may be stored gzip-compressed
+    with open(path, 'rb') as file:
+        compressed = file.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(path, 'rt')
+    return open(path, 'r', buffering=1 << 16)
+
+
+def trace_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_binary_trace(path):
+    with open(path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def read_text_trace(path):
+    packed = bytearray()
+    count = 0
+    with open_text(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            packed += pack_record(*parse_line(line))
+            count += 1
+    return Trace(packed, count)
+
+
+def stream_text_trace(path):
+    # Lazily yields records so memory stays flat regardless of trace length
+    with open_text(path) as file:
+        for line in file:
+            if line.strip():
+                yield parse_line(line)
+
+
+def read_binary_trace(path):
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError(f"{path}: truncated trace header")
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count = HEADER.unpack_from(mm)
+    if magic != MAGIC or version != VERSION:
+        mm.close()
+        raise ValueError(f"{path}: not a version {VERSION} binary trace")
+    if size < HEADER.size + count * RECORD.size:
+        mm.close()
+        raise ValueError(f"{path}: truncated trace, expected {count} records")
+    return Trace(memoryview(mm)[HEADER.size:], count, mm)
+
+
+def load_trace(path, stream=False):
+    if is_binary_trace(path):
+        return read_binary_trace(path)  # already paged in lazily by mmap
+    if stream:
+        return stream_text_trace(path)
+    return read_text_trace(path)
+
+
+def convert_trace(src, dst):
+    # Streams the text trace so arbitrarily large inputs convert in constant memory
+    count = 0
+    with open_text(src) as infile, open(dst, 'wb') as outfile:
+        outfile.write(HEADER.pack(MAGIC, VERSION, 0))
+        chunk = bytearray()
+        for line in infile:
+            if not line.strip():
+                continue
+            chunk += pack_record(*parse_line(line))
+            count += 1
+            if len(chunk) >= 1 << 20:
+                outfile.write(chunk)
+                chunk.clear()
+        outfile.write(chunk)
+        outfile.seek(0)
+        outfile.write(HEADER.pack(MAGIC, VERSION, count))
+    return count
+
+
+# Suffixes in order of preference: converted binary, plain text, gzipped text
+TRACE_SUFFIXES = ('.bin', '.data', '.data.gz')
+TRACE_NAME = re.compile(r'_(\d+)(\.bin|\.data|\.data\.gz)$')
+
+
+def discover_traces(input_file, num_cores=None):
+    # input_file is a trace directory, a glob, or a benchmark name laid out
+    # as ./<name>_four/<name>_<core>.data; per-core files end in _<core id>
+    if os.path.isdir(input_file):
+        candidates = glob.glob(os.path.join(input_file, '*'))
+    elif glob.has_magic(input_file):
+        candidates = glob.glob(input_file)
+    else:
+        candidates = glob.glob(f"./{input_file}_four/{input_file}_*")
+
+    stems = {}  # core id -> {path without suffix: {suffix: path}}
+    for path in candidates:
+        match = TRACE_NAME.search(path)
+        if not match:
+            continue
+        core_id = int(match.group(1))
+        stem = path[:match.start(2)]
+        stems.setdefault(core_id, {}).setdefault(stem, {})[match.group(2)] = path
+
+    found = {}
+    for core_id, variants in stems.items():
+        if len(variants) > 1:
+            raise ValueError(f"Ambiguous traces for core {core_id} in {input_file}: "
+                             f"{', '.join(sorted(variants))}; pass a narrower glob")
+        (files,) = variants.values()
+        # a converted trace older than its text source is stale
+        binary = files.get('.bin')
+        if binary is not None and any(os.path.getmtime(binary) < os.path.getmtime(files[suffix])
+                                      for suffix in TRACE_SUFFIXES[1:] if suffix in files):
+            del files['.bin']
+        found[core_id] = next(files[suffix] for suffix in TRACE_SUFFIXES if suffix in files)
+
+    if num_cores is None:
+        num_cores = 0
+        while num_cores in found:
+            num_cores += 1
+    missing = [i for i in range(num_cores) if i not in found]
+    if not num_cores or missing:
+        raise FileNotFoundError(f"No trace for core(s) {missing or [0]} in {input_file}")
+    return [found[i] for i in range(num_cores)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert text traces to the packed binary format")
+    parser.add_argument("inputs", nargs='+', help="Text trace files (label hex per line)")
+    parser.add_argument("-o", "--output-dir", help="Directory for .bin files (default: next to input)")
+    args = parser.parse_args()
+
+    for src in args.inputs:
+        root = src[:-3] if src.endswith('.gz') else src
+        root, _ = os.path.splitext(root)
+        if args.output_dir:
+            root = os.path.join(args.output_dir, os.path.basename(root))
+        dst = root + '.bin'
+        count = convert_trace(src, dst)
+        print(f"{src} -> {dst} ({count} records)")
+
+
+if __name__ == "__main__":
+    main()